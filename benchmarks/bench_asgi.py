@@ -0,0 +1,264 @@
+"""Пропускная способность WSGI и ASGI при многих одновременных соединениях.
+
+Оба варианта обслуживают Django одним и тем же числом потоков
+(--threads): WSGI — пул потоков на соединение, как gunicorn --threads,
+ASGI — yatube/asgi.py за минимальным asyncio-сервером. Нагрузку даёт
+asyncio-клиент в отдельном процессе: --connections соединений подряд
+запрашивают ленты и посты. Во втором замере к ним добавляются
+--uploaders клиентов, которые медленно, кусками с паузой --upload-delay,
+отправляют POST с телом --upload-bytes (как загрузка картинки из
+мобильной сети): WSGI-поток читает такое тело всё это время.
+
+    python benchmarks/bench_asgi.py --connections 64 --threads 8
+"""
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from utils import seed, setup_django
+
+PATHS = ('/', '/group/group-1/', '/profile/user1/', '/posts/1/')
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class PoolWSGIServer(WSGIServer):
+    """WSGI-сервер с фиксированным пулом: поток занят весь запрос."""
+
+    request_queue_size = 1024
+
+    def __init__(self, address, threads):
+        super().__init__(address, QuietHandler)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request,
+                         client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def serve_wsgi(sock, threads):
+    from yatube.wsgi import application
+
+    server = PoolWSGIServer(('127.0.0.1', 0), threads)
+    server.socket.close()
+    server.socket = sock
+    server.server_address = sock.getsockname()
+    server.setup_environ()
+    server.set_app(application)
+    server.serve_forever()
+
+
+async def asgi_connection(application, reader, writer):
+    try:
+        method, target, version = (
+            (await reader.readline()).decode('latin1').split()
+        )
+        headers = []
+        while True:
+            line = (await reader.readline()).rstrip(b'\r\n')
+            if not line:
+                break
+            name, value = line.split(b':', 1)
+            headers.append((name.strip().lower(), value.strip()))
+        length = int(dict(headers).get(b'content-length', 0))
+        body = await reader.readexactly(length) if length else b''
+    except (ValueError, asyncio.IncompleteReadError):
+        writer.close()
+        return
+    path, _, query = target.partition('?')
+    scope = {
+        'type': 'http', 'method': method, 'path': path,
+        'query_string': query.encode('latin1'), 'headers': headers,
+        'http_version': version.split('/')[1],
+        'server': writer.get_extra_info('sockname')[:2],
+        'client': writer.get_extra_info('peername')[:2],
+    }
+    messages = [{'type': 'http.request', 'body': body}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            head = [f'HTTP/1.1 {message["status"]} -'.encode()]
+            head += [name + b': ' + value
+                     for name, value in message['headers']]
+            head.append(b'Connection: close')
+            writer.write(b'\r\n'.join(head) + b'\r\n\r\n')
+        else:
+            writer.write(message.get('body', b''))
+        await writer.drain()
+
+    try:
+        await application(scope, receive, send)
+    finally:
+        writer.close()
+
+
+def serve_asgi(sock, threads):
+    from django.conf import settings
+
+    settings.ASGI_THREADS = threads
+    from yatube.asgi import application
+
+    async def main():
+        server = await asyncio.start_server(
+            lambda reader, writer: asgi_connection(
+                application, reader, writer
+            ),
+            sock=sock, backlog=1024,
+        )
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+async def request(port, head, body=b'', pieces=1, delay=0):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(head.encode('latin1') + b'\r\n\r\n')
+        step = -(-len(body) // pieces) if body else 0
+        for offset in range(0, len(body), step or 1):
+            writer.write(body[offset:offset + step])
+            await writer.drain()
+            if delay:
+                await asyncio.sleep(delay)
+        return await reader.read()
+    finally:
+        writer.close()
+
+
+async def reader_client(port, number, stop_at, latencies, errors):
+    index = number
+    while time.monotonic() < stop_at:
+        path = PATHS[index % len(PATHS)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            response = await request(
+                port, f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+                      'Connection: close',
+            )
+        except OSError:
+            errors.append(path)
+            continue
+        if response.split(b' ', 2)[1:2] != [b'200']:
+            errors.append(path)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def uploader(port, stop_at, size, delay):
+    """POST на ленту с cookie csrftoken.
+
+    Проверка CSRF ищет токен формы и поэтому читает тело целиком, а затем
+    отвечает 403.
+    """
+    body = b'text=' + b'x' * (size - 5)
+    while time.monotonic() < stop_at:
+        try:
+            await request(
+                port, 'POST / HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+                      'Content-Type: application/x-www-form-urlencoded\r\n'
+                      f'Cookie: csrftoken={"a" * 64}\r\n'
+                      f'Content-Length: {len(body)}\r\nConnection: close',
+                body, pieces=16, delay=delay,
+            )
+        except OSError:
+            pass
+
+
+def load(port, connections, seconds, uploaders=0, upload_bytes=0,
+         upload_delay=0):
+    latencies, errors = [], []
+
+    async def main():
+        stop_at = time.monotonic() + seconds
+        await asyncio.gather(
+            *(reader_client(port, number, stop_at, latencies, errors)
+              for number in range(connections)),
+            *(uploader(port, stop_at, upload_bytes, upload_delay)
+              for _ in range(uploaders)),
+        )
+
+    asyncio.run(main())
+    latencies.sort()
+    return {
+        'rps': len(latencies) / seconds,
+        'p50': statistics.median(latencies) if latencies else 0,
+        'p95': latencies[int(len(latencies) * 0.95)] if latencies else 0,
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--uploaders', type=int, default=16)
+    parser.add_argument('--upload-bytes', type=int, default=256 * 1024)
+    parser.add_argument('--upload-delay', type=float, default=0.05)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from django.db import connections
+
+    seed(users=200, groups=10, posts=args.posts, follows_per_user=5)
+    connections.close_all()
+
+    fork = multiprocessing.get_context('fork')
+    print(f'== {args.connections} соединений, {args.threads} потоков Django, '
+          f'{args.seconds:g} с на замер')
+    scenarios = (
+        ('только чтение', {}),
+        (f'чтение и {args.uploaders} медленных загрузок', {
+            'uploaders': args.uploaders,
+            'upload_bytes': args.upload_bytes,
+            'upload_delay': args.upload_delay,
+        }),
+    )
+    for label, extra in scenarios:
+        print(label)
+        for name, serve in (('WSGI', serve_wsgi), ('ASGI', serve_asgi)):
+            sock = socket.socket()
+            sock.bind(('127.0.0.1', 0))
+            sock.listen(1024)
+            server = fork.Process(target=serve, args=(sock, args.threads),
+                                  daemon=True)
+            server.start()
+            port = sock.getsockname()[1]
+            load(port, args.threads, 1)  # прогрев кэшей сервера
+            result = load(port, args.connections, args.seconds, **extra)
+            server.terminate()
+            server.join()
+            sock.close()
+            print(f'  {name}: {result["rps"]:8.1f} запросов/с   '
+                  f'p50 {result["p50"]:8.1f} ms   p95 {result["p95"]:8.1f} ms'
+                  f'   ошибок {result["errors"]}')
+
+
+if __name__ == '__main__':
+    main()
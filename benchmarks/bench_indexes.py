@@ -0,0 +1,75 @@
+"""Планы запросов и задержки лент до и после составных индексов Post.
+
+    python benchmarks/bench_indexes.py --posts 1000000
+"""
+import argparse
+
+from utils import explain, measure, seed, setup_django
+
+INDEXES = (
+    'post_pub_date_idx',
+    'post_group_pub_date_idx',
+    'post_author_pub_date_idx',
+)
+
+
+def queries():
+    from posts.models import Follow, Post
+
+    middle = Post.objects.order_by('-pub_date', '-id')[
+        Post.objects.count() // 2
+    ]
+    return {
+        'index': lambda: Post.objects.order_by('-pub_date', '-id')[:11],
+        'index deep cursor': lambda: Post.objects.filter(
+            pub_date__lt=middle.pub_date
+        ).order_by('-pub_date', '-id')[:11],
+        'group': lambda: Post.objects.filter(
+            group_id=1
+        ).order_by('-pub_date', '-id')[:11],
+        'profile': lambda: Post.objects.filter(
+            author_id=1
+        ).order_by('-pub_date', '-id')[:11],
+        'follow exists': lambda: Follow.objects.filter(
+            user_id=2, author_id=1
+        ),
+    }
+
+
+def run(title):
+    print(f'== {title}')
+    for name, build in queries().items():
+        median, p95 = measure(lambda: list(build()))
+        print(f'{name:<20} median {median:8.2f} ms   p95 {p95:8.2f} ms')
+        for line in explain(build()):
+            print(f'{"":<20} {line}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from django.db import connection
+    from posts.models import Post
+
+    seed(users=args.users, posts=args.posts)
+
+    with connection.cursor() as cursor:
+        for name in INDEXES:
+            cursor.execute(f'DROP INDEX {name}')
+    run(f'без составных индексов, постов: {args.posts}')
+
+    with connection.schema_editor() as editor:
+        for index in Post._meta.indexes:
+            editor.add_index(Post, index)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    run(f'с составными индексами, постов: {args.posts}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Задержка полнотекстового поиска на большом числе постов.
+
+    python benchmarks/bench_search.py --posts 1000000
+"""
+import argparse
+
+from utils import measure, seed, setup_django
+
+QUERIES = ('пост', 'пост 12345', 'нет такого слова')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from posts.search import get_backend
+
+    seed(posts=args.posts)
+    backend = get_backend()
+    backend.rebuild()
+
+    print(f'== поиск, постов: {args.posts}')
+    for query in QUERIES:
+        first = backend.search(query)
+        median, p95 = measure(lambda: backend.search(query))
+        print(f'{query!r:<24} первая страница median {median:8.2f} ms'
+              f'   p95 {p95:8.2f} ms')
+        if first.has_next():
+            median, p95 = measure(
+                lambda: backend.search(query, cursor=first.next_cursor)
+            )
+            print(f'{"":<24} по курсору      median {median:8.2f} ms'
+                  f'   p95 {p95:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
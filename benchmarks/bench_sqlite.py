@@ -0,0 +1,131 @@
+"""Пропускная способность SQLite при одновременных чтениях и записях.
+
+Сравнивает настройки по умолчанию с режимом SQLITE_TUNING (WAL,
+synchronous=NORMAL, mmap, busy_timeout и повторы записи):
+
+    python benchmarks/bench_sqlite.py --readers 8 --writers 4 --seconds 10
+"""
+import argparse
+import os
+import random
+import shutil
+import threading
+import time
+
+from utils import seed, setup_django
+
+TUNED = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def reader(stop, stats):
+    from django.db import OperationalError, connection
+    from posts.models import Post
+
+    rnd = random.Random()
+    try:
+        while not stop.is_set():
+            try:
+                list(Post.objects.select_related('author', 'group').filter(
+                    group_id=rnd.randint(1, 50)
+                ).order_by('-pub_date', '-id')[:10])
+                stats['reads'] += 1
+            except OperationalError:
+                stats['read_errors'] += 1
+    finally:
+        connection.close()
+
+
+def writer(stop, stats, retry):
+    from django.db import OperationalError, connection, transaction
+    from core.db import retry_on_locked
+    from posts.models import Comment, Post
+
+    rnd = random.Random()
+    post_count = Post.objects.count()
+
+    @transaction.atomic
+    def add_comment():
+        # Как в posts.views.add_comment: сначала чтение, потом запись.
+        post = Post.objects.get(pk=rnd.randint(1, post_count))
+        Comment.objects.create(post=post, author_id=post.author_id,
+                               text='Комментарий')
+
+    if retry:
+        add_comment = retry_on_locked(add_comment)
+    try:
+        while not stop.is_set():
+            try:
+                add_comment()
+                stats['writes'] += 1
+            except OperationalError:
+                stats['write_errors'] += 1
+    finally:
+        connection.close()
+
+
+def run(title, path, args, retry):
+    from django.conf import settings
+    from django.db import connection
+
+    connection.close()
+    settings.DATABASES['default']['NAME'] = path
+    stop = threading.Event()
+    results = []
+    threads = []
+    for target, count, extra in (
+        (reader, args.readers, ()),
+        (writer, args.writers, (retry,)),
+    ):
+        for _ in range(count):
+            stats = dict.fromkeys(
+                ('reads', 'read_errors', 'writes', 'write_errors'), 0
+            )
+            results.append(stats)
+            threads.append(threading.Thread(
+                target=target, args=(stop, stats, *extra)
+            ))
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    total = {key: sum(stats[key] for stats in results) for key in results[0]}
+    print(f'== {title}')
+    print(f'чтений/с {total["reads"] / args.seconds:10.1f}'
+          f'   ошибок {total["read_errors"]}')
+    print(f'записей/с {total["writes"] / args.seconds:9.1f}'
+          f'   ошибок {total["write_errors"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    path = setup_django(SQLITE_PRAGMAS={})
+    from django.conf import settings
+    from django.db import connection
+
+    seed(posts=args.posts)
+    connection.close()
+    tuned_path = os.path.join(os.path.dirname(path), 'tuned.sqlite3')
+    shutil.copyfile(path, tuned_path)
+
+    run('настройки по умолчанию', path, args, retry=False)
+    settings.SQLITE_PRAGMAS = TUNED
+    run('SQLITE_TUNING', tuned_path, args, retry=True)
+
+
+if __name__ == '__main__':
+    main()
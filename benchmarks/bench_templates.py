@@ -0,0 +1,102 @@
+"""Рендер шаблонов: загрузчики по умолчанию против cached.Loader.
+
+Сравнивает первый рендер ленты после старта (с прогревом и без него)
+и установившееся время рендера. Кэш отключён, чтобы карточки постов
+рендерились каждый раз.
+
+    python benchmarks/bench_templates.py
+"""
+import argparse
+import copy
+import time
+
+from utils import measure, seed, setup_django
+
+DUMMY_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def templates(cached):
+    """TEMPLATES проекта: как в settings.py (DEBUG = True) или боевой режим.
+
+    setup_django выключает DEBUG, а без явных loaders Django тогда сам
+    включает cached.Loader, поэтому debug задаётся явно.
+    """
+    from django.conf import settings
+
+    config = copy.deepcopy(settings.TEMPLATES)
+    config[0]['OPTIONS']['debug'] = True
+    if cached:
+        config[0]['APP_DIRS'] = False
+        config[0]['OPTIONS']['debug'] = False
+        config[0]['OPTIONS']['loaders'] = [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ]
+    return config
+
+
+def elapsed_ms(func):
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    setup_django(args.db, CACHES=DUMMY_CACHE)
+    from django.contrib.auth.models import AnonymousUser
+    from django.template.loader import render_to_string
+    from django.test import RequestFactory, override_settings
+
+    from core.template_backends import warm_up
+    from posts.models import Post
+    from posts.utils import FEED_RELATED, get_page_obj
+
+    seed(users=100, groups=10, posts=args.posts)
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    page = get_page_obj(request, Post.objects.select_related(*FEED_RELATED))
+    card = page[0]
+
+    def render_index():
+        render_to_string('posts/index.html', {'page_obj': page}, request)
+
+    def render_card():
+        render_to_string('posts/includes/post_card.html', {'post': card})
+
+    # Импорт библиотек тегов и прочее разовое — до замеров.
+    render_index()
+    print(f'== шаблоны, постов на странице: {len(page)}')
+    for name, cached in (('по умолчанию', False), ('cached.Loader', True)):
+        config = templates(cached)
+        # override_settings(TEMPLATES=...) пересоздаёт движки шаблонов:
+        # каждый замер «холодного» рендера начинается как новый воркер.
+        with override_settings(TEMPLATES=config):
+            cold = elapsed_ms(render_index)
+        with override_settings(TEMPLATES=config):
+            boot = elapsed_ms(warm_up)
+            warm = elapsed_ms(render_index)
+        with override_settings(TEMPLATES=config):
+            index = measure(render_index, args.repeat)
+            card_times = measure(render_card, args.repeat)
+        print(f'{name}:')
+        print(f'  первый рендер ленты        {cold:8.2f} ms')
+        print(f'  прогрев при старте         {boot:8.2f} ms, '
+              f'затем первый рендер {warm:8.2f} ms')
+        print(f'  лента      median {index[0]:8.2f} ms'
+              f'   p95 {index[1]:8.2f} ms')
+        print(f'  карточка   median {card_times[0]:8.2f} ms'
+              f'   p95 {card_times[1]:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+"""Нагрузочный прогон всех адресов posts.urls и users.urls.
+
+Наполняет базу реалистичным набором через mixer/Faker (как фикстуры
+tests/): пользователи, группы, посты с картинками, комментарии и граф
+подписок со степенным распределением. Затем гоняет каждый маршрут через
+тестовый клиент Django (с подсчётом SQL-запросов) и через локальный
+WSGI-сервер и печатает p50/p95/p99, запросы и байты на ответ.
+
+    python benchmarks/load_suite.py
+    python benchmarks/load_suite.py --save-baseline
+    python benchmarks/load_suite.py --baseline benchmarks/baseline.json
+
+С --baseline скрипт завершается с кодом 1, если число запросов выросло
+или p95 стал хуже базового больше чем на --tolerance (и на --slack-ms).
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from io import BytesIO
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from utils import setup_django
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'baseline.json')
+PASSWORD = 'bench-password'
+DATASET_OPTIONS = ('users', 'groups', 'posts', 'comments', 'follows',
+                   'image_share', 'seed')
+
+Scenario = namedtuple(
+    'Scenario', 'name url_name kwargs method user data query setup',
+)
+
+
+def scenario(name, url_name, kwargs=None, method='get', user=None,
+             data=None, query=None, setup=None):
+    return Scenario(name, url_name, kwargs or {}, method, user, data,
+                    query, setup)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def image_file(rnd):
+    from django.core.files.base import ContentFile
+    from PIL import Image
+
+    buffer = BytesIO()
+    color = tuple(rnd.randrange(256) for _ in range(3))
+    Image.new('RGB', (1280, 720), color).save(buffer, 'JPEG', quality=80)
+    return ContentFile(buffer.getvalue(), name='bench.jpg')
+
+
+def seed(args):
+    """Набор данных через ORM: сигналы заполняют счётчики, ленты и поиск."""
+    from django.contrib.auth import get_user_model
+    from mixer.backend.django import mixer
+    from posts.models import Comment, Follow, Group, Post
+
+    User = get_user_model()
+    rnd = random.Random(args.seed)
+    users = mixer.cycle(args.users).blend(
+        User, username=mixer.sequence('user{0}'),
+    )
+    for user in users:
+        user.set_password(PASSWORD)
+    User.objects.bulk_update(users, ['password'])
+    groups = mixer.cycle(args.groups).blend(
+        Group, slug=mixer.sequence('group-{0}'),
+    )
+    posts = []
+    for i in range(args.posts):
+        # Авторы тоже по степенному закону: у немногих много постов.
+        author = users[min(int(rnd.paretovariate(1.2)), len(users)) - 1]
+        post = Post(
+            author=author,
+            group=rnd.choice(groups) if rnd.random() < 0.7 else None,
+            text=mixer.faker.text(max_nb_chars=rnd.choice((80, 400, 1500))),
+        )
+        if rnd.random() < args.image_share:
+            post.image = image_file(rnd)
+        post.save()
+        posts.append(post)
+    for _ in range(args.comments):
+        # Комментарии скапливаются у первых (популярных) постов.
+        post = posts[min(int(rnd.paretovariate(1.1)), len(posts)) - 1]
+        Comment.objects.create(
+            post=post, author=rnd.choice(users),
+            text=mixer.faker.sentence(),
+        )
+    for user in users:
+        for _ in range(args.follows):
+            author = users[min(int(rnd.paretovariate(1.2)), len(users)) - 1]
+            if author != user:
+                Follow.objects.get_or_create(user=user, author=author)
+    return users, groups, posts
+
+
+def scenarios(users, groups, posts):
+    """Сценарий на каждый маршрут; в данных — самые «тяжёлые» объекты."""
+    from django.db.models import Count
+    from posts.models import Follow, Post
+
+    star = users[0]
+    reader = users[-1]
+    # Выход завершает сессию, поэтому у него свой пользователь.
+    leaver = users[-2]
+    popular = Post.objects.annotate(
+        comment_total=Count('comments')
+    ).order_by('-comment_total').first()
+    own = Post.objects.filter(author=star).first()
+    group = max(groups, key=lambda group: group.posts.count())
+
+    def unfollow_setup(client):
+        Follow.objects.get_or_create(user=reader, author=star)
+
+    def login_setup(client):
+        client.force_login(leaver)
+
+    return [
+        scenario('index', 'posts:index'),
+        scenario('index auth', 'posts:index', user=reader),
+        scenario('index page 5', 'posts:index', query={'page': 5}),
+        scenario('group_list', 'posts:group_list', {'slug': group.slug}),
+        scenario('profile', 'posts:profile', {'username': star.username}),
+        scenario('profile auth', 'posts:profile',
+                 {'username': star.username}, user=reader),
+        scenario('post_detail', 'posts:post_detail',
+                 {'post_id': popular.pk}),
+        scenario('post_detail auth', 'posts:post_detail',
+                 {'post_id': popular.pk}, user=reader),
+        scenario('post_comments', 'posts:post_comments',
+                 {'post_id': popular.pk}),
+        scenario('post_create form', 'posts:post_create', user=reader),
+        scenario('post_create', 'posts:post_create', method='post',
+                 user=reader, data={'text': 'Нагрузочный пост'}),
+        scenario('post_edit form', 'posts:post_edit', {'post_id': own.pk},
+                 user=star),
+        scenario('add_comment', 'posts:add_comment',
+                 {'post_id': popular.pk}, method='post', user=reader,
+                 data={'text': 'Нагрузочный комментарий'}),
+        scenario('follow_index', 'posts:follow_index', user=reader),
+        scenario('search', 'posts:search', query={'q': 'et'}),
+        scenario('profile_follow', 'posts:profile_follow',
+                 {'username': star.username}, user=reader),
+        scenario('profile_unfollow', 'posts:profile_unfollow',
+                 {'username': star.username}, user=reader,
+                 setup=unfollow_setup),
+        scenario('logout', 'users:logout', user=leaver, setup=login_setup),
+        scenario('signup', 'users:signup'),
+        scenario('login', 'users:login'),
+        scenario('password_change', 'users:password_change', user=reader),
+        scenario('password_change_done', 'users:password_change_done',
+                 user=reader),
+        scenario('password_reset_form', 'users:password_reset_form'),
+        scenario('password_reset_done', 'users:password_reset_done'),
+    ]
+
+
+def check_coverage(items):
+    """Каждый именованный маршрут posts и users должен иметь сценарий."""
+    from posts.urls import urlpatterns as posts_urls
+    from users.urls import urlpatterns as users_urls
+
+    routes = {f'posts:{url.name}' for url in posts_urls}
+    routes |= {f'users:{url.name}' for url in users_urls}
+    missing = routes - {item.url_name for item in items}
+    if missing:
+        sys.exit(f'Нет сценариев для маршрутов: {", ".join(sorted(missing))}')
+
+
+def path_for(item):
+    from urllib.parse import urlencode
+    from django.urls import reverse
+
+    path = reverse(item.url_name, kwargs=item.kwargs)
+    if item.query:
+        path += '?' + urlencode(item.query)
+    return path
+
+
+class TestClientDriver:
+    name = 'client'
+
+    def __init__(self):
+        from django.test import Client
+
+        self.clients = {}
+        self.anonymous = Client()
+
+    def client(self, user):
+        from django.test import Client
+
+        if user is None:
+            return self.anonymous
+        if user.pk not in self.clients:
+            self.clients[user.pk] = Client()
+            self.clients[user.pk].force_login(user)
+        return self.clients[user.pk]
+
+    def prepare(self, item):
+        client = self.client(item.user)
+        if item.setup is not None:
+            item.setup(client)
+
+    def request(self, item, path):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        client = self.client(item.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, item.method)(path, item.data or {})
+        return response.status_code, len(response.content), len(queries)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class WSGIDriver:
+    """Настоящий HTTP через wsgiref; сессии берутся у тестового клиента."""
+
+    name = 'wsgi'
+
+    def __init__(self):
+        from django.core.handlers.wsgi import WSGIHandler
+        from django.utils.crypto import get_random_string
+
+        self.server = make_server(
+            '127.0.0.1', 0, WSGIHandler(),
+            server_class=ThreadingWSGIServer, handler_class=QuietHandler,
+        )
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        self.sessions = TestClientDriver()
+        self.csrf = get_random_string(64)
+
+    def prepare(self, item):
+        self.sessions.prepare(item)
+
+    def cookies(self, user):
+        cookies = {'csrftoken': self.csrf}
+        if user is not None:
+            client = self.sessions.client(user)
+            cookies['sessionid'] = client.cookies['sessionid'].value
+        return '; '.join(f'{key}={value}' for key, value in cookies.items())
+
+    def request(self, item, path):
+        from urllib.parse import urlencode
+
+        headers = {'Cookie': self.cookies(item.user), 'Host': '127.0.0.1'}
+        body = None
+        if item.method == 'post':
+            body = urlencode(item.data or {})
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.csrf
+        connection = http.client.HTTPConnection('127.0.0.1', self.port)
+        try:
+            connection.request(item.method.upper(), path, body, headers)
+            response = connection.getresponse()
+            return response.status, len(response.read()), None
+        finally:
+            connection.close()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def run(driver, items, repeat):
+    results = {}
+    for item in items:
+        path = path_for(item)
+        timings, sizes, queries, statuses = [], [], [], set()
+        for attempt in range(repeat + 1):
+            driver.prepare(item)
+            started = time.perf_counter()
+            status, size, count = driver.request(item, path)
+            elapsed = (time.perf_counter() - started) * 1000
+            statuses.add(status)
+            if attempt == 0:
+                continue  # прогрев: кэши и соединения
+            timings.append(elapsed)
+            sizes.append(size)
+            if count is not None:
+                queries.append(count)
+        results[f'{driver.name}:{item.name}'] = {
+            'status': sorted(statuses),
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'queries': max(queries) if queries else None,
+            'bytes': int(statistics.median(sizes)),
+        }
+    return results
+
+
+def report(results):
+    print(f'{"сценарий":<32}{"код":>8}{"p50":>9}{"p95":>9}{"p99":>9}'
+          f'{"SQL":>6}{"байт":>9}')
+    for name, row in results.items():
+        status = ','.join(str(code) for code in row['status'])
+        queries = '-' if row['queries'] is None else row['queries']
+        print(f'{name:<32}{status:>8}{row["p50_ms"]:9.2f}'
+              f'{row["p95_ms"]:9.2f}{row["p99_ms"]:9.2f}{queries:>6}'
+              f'{row["bytes"]:>9}')
+
+
+def regressions(results, baseline, tolerance, slack_ms):
+    found = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if (
+            row['queries'] is not None and base['queries'] is not None
+            and row['queries'] > base['queries']
+        ):
+            found.append(f'{name}: SQL {base["queries"]} -> {row["queries"]}')
+        limit = base['p95_ms'] * (1 + tolerance) + slack_ms
+        if row['p95_ms'] > limit:
+            found.append(
+                f'{name}: p95 {base["p95_ms"]} -> {row["p95_ms"]} мс'
+            )
+        if row['status'] != base['status']:
+            found.append(f'{name}: код {base["status"]} -> {row["status"]}')
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--groups', type=int, default=10)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--comments', type=int, default=3000)
+    parser.add_argument('--follows', type=int, default=10,
+                        help='Подписок на пользователя.')
+    parser.add_argument('--image-share', type=float, default=0.02,
+                        help='Доля постов с картинкой.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--mode', choices=('client', 'wsgi', 'both'),
+                        default='both')
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--baseline', help='Сравнить с сохранённым JSON.')
+    parser.add_argument('--save-baseline', nargs='?', const=BASELINE,
+                        help=f'Сохранить результат, по умолчанию {BASELINE}.')
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    parser.add_argument('--slack-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    setup_django(
+        args.db,
+        POST_THUMBNAIL_SYNC=True,
+        PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        MEDIA_ROOT=tempfile.mkdtemp(prefix='bench-media-'),
+    )
+    started = time.perf_counter()
+    users, groups, posts = seed(args)
+    print(f'== данные: {args.users} польз., {args.groups} групп, '
+          f'{args.posts} постов, {args.comments} комм. '
+          f'за {time.perf_counter() - started:.1f} с')
+    items = scenarios(users, groups, posts)
+    check_coverage(items)
+
+    results = {}
+    drivers = []
+    if args.mode in ('client', 'both'):
+        drivers.append(TestClientDriver())
+    if args.mode in ('wsgi', 'both'):
+        drivers.append(WSGIDriver())
+    for driver in drivers:
+        results.update(run(driver, items, args.repeat))
+        if hasattr(driver, 'close'):
+            driver.close()
+    report(results)
+
+    dataset = {name: getattr(args, name) for name in DATASET_OPTIONS}
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            json.dump({'dataset': dataset, 'results': results}, file,
+                      indent=2, ensure_ascii=False)
+            file.write('\n')
+        print(f'Базовый результат сохранён в {args.save_baseline}')
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline['dataset'] != dataset:
+            print(f'Внимание: базовый результат снят на другом наборе '
+                  f'{baseline["dataset"]}')
+        found = regressions(results, baseline['results'], args.tolerance,
+                            args.slack_ms)
+        if found:
+            print('Регрессии:')
+            for line in found:
+                print(f'  {line}')
+            sys.exit(1)
+        print('Регрессий нет.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Общие помощники для бенчмарков.
+
+Скрипты запускаются из корня репозитория, например:
+
+    python benchmarks/bench_indexes.py --posts 1000000
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT = os.path.join(ROOT, 'yatube')
+
+
+def setup_django(db_path=None, **overrides):
+    """Настраивает Django на отдельную SQLite-базу и применяет миграции."""
+    sys.path.insert(0, PROJECT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    from django.conf import settings
+
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.DEBUG = False
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command('migrate', verbosity=0)
+    return db_path
+
+
+def seed(users=1000, groups=50, posts=100000, follows_per_user=20,
+         comments=0, batch_size=50000):
+    """Быстро наполняет базу сырыми INSERT, минуя сигналы."""
+    from django.db import connection, transaction
+
+    rnd = random.Random(42)
+    start = datetime(2020, 1, 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO auth_user (password, is_superuser, username, '
+            'first_name, last_name, email, is_staff, is_active, date_joined) '
+            "VALUES ('', 0, %s, '', '', '', 0, 1, %s)",
+            [(f'user{i}', start) for i in range(users)],
+        )
+        cursor.executemany(
+            'INSERT INTO posts_group (title, slug, description) '
+            "VALUES (%s, %s, '')",
+            [(f'Группа {i}', f'group-{i}') for i in range(groups)],
+        )
+        for offset in range(0, posts, batch_size):
+            rows = []
+            for i in range(offset, min(offset + batch_size, posts)):
+                pub_date = start + timedelta(seconds=i)
+                rows.append((
+                    f'Пост {i}',
+                    pub_date,
+                    pub_date,
+                    rnd.randint(1, users),
+                    rnd.randint(1, groups) if rnd.random() < 0.7 else None,
+                ))
+            cursor.executemany(
+                'INSERT INTO posts_post (text, pub_date, updated, author_id, '
+                'group_id, image, thumbnail, variants, comments_count) '
+                "VALUES (%s, %s, %s, %s, %s, '', '', '', 0)",
+                rows,
+            )
+        follows = set()
+        for user in range(1, users + 1):
+            for _ in range(follows_per_user):
+                author = min(int(rnd.paretovariate(1.2)), users)
+                if author != user:
+                    follows.add((user, author))
+        cursor.executemany(
+            'INSERT INTO posts_follow (user_id, author_id) VALUES (%s, %s)',
+            sorted(follows),
+        )
+        cursor.executemany(
+            'INSERT INTO posts_comment (text, pub_date, author_id, post_id) '
+            'VALUES (%s, %s, %s, %s)',
+            [
+                (f'Комментарий {i}', start + timedelta(seconds=i),
+                 rnd.randint(1, users), rnd.randint(1, posts))
+                for i in range(comments)
+            ],
+        )
+        cursor.execute('ANALYZE')
+
+
+def measure(func, repeat=20):
+    """Возвращает медиану и p95 времени вызова в миллисекундах."""
+    func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return (
+        statistics.median(timings),
+        timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    )
+
+
+def explain(queryset):
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.core.signals import request_started
+        from django.db.backends.signals import connection_created
+
+        from .db import apply_sqlite_pragmas, close_unusable_connections
+
+        request_started.connect(close_unusable_connections)
+        connection_created.connect(apply_sqlite_pragmas)
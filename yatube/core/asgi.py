@@ -0,0 +1,164 @@
+"""ASGI 3 поверх WSGI-обработчика Django.
+
+Django 2.2 не поддерживает ни ASGI, ни асинхронные представления,
+поэтому асинхронна только работа с сокетом: тело запроса читается в
+цикле событий, Django (middleware, ORM, шаблоны) выполняется в пуле из
+ASGI_THREADS потоков, а куски ответа отправляются из цикла событий —
+поток занят, только пока ответ готовится. Медленный клиент держит
+корутину, а не поток пула.
+"""
+import asyncio
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+_DONE = object()
+
+
+def build_environ(scope, body):
+    """WSGI-окружение для http-области ASGI (PEP 3333: строки в latin-1)."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': str(client[0]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class ASGIHandler:
+    def __init__(self, wsgi_application, threads=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or settings.ASGI_THREADS,
+            thread_name_prefix='asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        # Большие загрузки (картинки) уходят во временный файл.
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.ASGI_BODY_SPOOL_BYTES
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    def respond(self, environ, emit, cancelled):
+        """Весь ответ в одном потоке пула: вызов, итерация и close().
+
+        Потоковый ответ (core.streaming) выполняет запросы к БД, пока его
+        итерируют. Соединения с БД принадлежат потоку, поэтому close() с
+        request_finished должен выполниться в том же потоке, что и
+        итерация, иначе CONN_MAX_AGE и проверка ошибок соединения их не
+        увидят. Куски передаются в цикл событий не дожидаясь отправки:
+        поток освобождается, как только ответ готов.
+        """
+        def start_response(status, headers, exc_info=None):
+            emit({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in headers
+                ],
+            })
+
+        response = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in response:
+                if cancelled.is_set():
+                    break
+                if chunk:
+                    emit({'type': 'http.response.body', 'body': chunk,
+                          'more_body': True})
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+
+    async def watch_disconnect(self, receive, cancelled):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        cancelled.set()
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def emit(message):
+            loop.call_soon_threadsafe(messages.put_nowait, message)
+
+        with body:
+            done = loop.run_in_executor(
+                self.executor, self.respond,
+                build_environ(scope, body), emit, cancelled,
+            )
+            # Завершение future приходит в цикл после всех кусков.
+            done.add_done_callback(lambda _: messages.put_nowait(_DONE))
+            # Клиент ушёл — поток перестаёт рендерить ответ.
+            watcher = asyncio.ensure_future(
+                self.watch_disconnect(receive, cancelled)
+            )
+            try:
+                while True:
+                    message = await messages.get()
+                    if message is _DONE:
+                        break
+                    if not cancelled.is_set():
+                        await send(message)
+            finally:
+                watcher.cancel()
+            await done
+        if not cancelled.is_set():
+            await send({'type': 'http.response.body', 'body': b''})
@@ -0,0 +1,127 @@
+import math
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+
+def _envelope(value, delta, timeout):
+    return (value, delta, time.time() + timeout)
+
+
+def _is_fresh(entry, beta):
+    """Вероятностное раннее истечение (XFetch).
+
+    Чем ближе срок жизни и чем дольше пересчёт значения, тем выше
+    шанс, что текущий запрос пересчитает его заранее, пока остальные
+    продолжают получать старое.
+    """
+    _, delta, expires_at = entry
+    jitter = -delta * beta * math.log(1.0 - random.random())
+    return time.time() + jitter < expires_at
+
+
+def get_many(keys, beta=None, stale=None):
+    """Свежие значения для ключей; рано истекающие считаются промахом.
+
+    В словарь stale складываются прочитанные, но отброшенные записи:
+    fill_many отдаст их, пока значение пересчитывает другой воркер.
+    """
+    if beta is None:
+        beta = settings.CACHE_EARLY_EXPIRATION_BETA
+    values = {}
+    for key, entry in cache.get_many(keys).items():
+        if _is_fresh(entry, beta):
+            values[key] = entry[0]
+        elif stale is not None:
+            stale[key] = entry
+    metrics.cache_lookups(len(values), len(keys) - len(values))
+    return values
+
+
+def set_many(values, timeout, delta=0.0):
+    cache.set_many(
+        {key: _envelope(value, delta, timeout)
+         for key, value in values.items()},
+        timeout,
+    )
+
+
+def _lock(key):
+    return f'{key}:lock'
+
+
+def _release(tokens):
+    """Снимает только свои блокировки.
+
+    Если пересчёт шёл дольше CACHE_LOCK_TIMEOUT, блокировка успела
+    истечь и её мог взять другой воркер — её не трогаем.
+    """
+    locks = {_lock(key): token for key, token in tokens.items()}
+    held = cache.get_many(list(locks))
+    own = [lock for lock, token in locks.items() if held.get(lock) == token]
+    if own:
+        cache.delete_many(own)
+
+
+def _wait(key, factory, entry):
+    if entry is not None:
+        return entry[0]
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return factory()
+
+
+def fill_many(factories, timeout, stale=None):
+    """Пересчитывает промахи, каждый ключ не более чем в одном месте сразу.
+
+    factories — {ключ: функция значения} для ключей, уже не найденных
+    через get_many или get_or_set: кэш повторно не читается, промахи не
+    считаются второй раз. Пересчёт выполняет тот, кто первым захватил
+    блокировку через cache.add; остальные отдают устаревшее значение из
+    stale или ждут, пока оно появится, и лишь по таймауту считают его
+    сами. Новые значения пишутся одним set_many.
+    """
+    stale = stale or {}
+    tokens = {}
+    for key in factories:
+        token = uuid.uuid4().hex
+        if cache.add(_lock(key), token, settings.CACHE_LOCK_TIMEOUT):
+            tokens[key] = token
+    values, entries = {}, {}
+    try:
+        for key in tokens:
+            started = time.monotonic()
+            values[key] = factories[key]()
+            delta = time.monotonic() - started
+            entries[key] = _envelope(values[key], delta, timeout)
+        if entries:
+            cache.set_many(entries, timeout)
+    finally:
+        if tokens:
+            _release(tokens)
+    for key, factory in factories.items():
+        if key not in values:
+            values[key] = _wait(key, factory, stale.get(key))
+    return values
+
+
+def get_or_set(key, factory, timeout, beta=None):
+    """Читает ключ, пересчитывая его не более чем в одном месте сразу."""
+    if beta is None:
+        beta = settings.CACHE_EARLY_EXPIRATION_BETA
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(entry, beta):
+        metrics.cache_lookups(hits=1)
+        return entry[0]
+    metrics.cache_lookups(misses=1)
+    stale = {key: entry} if entry is not None else None
+    return fill_many({key: factory}, timeout, stale)[key]
@@ -0,0 +1,141 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+_use_replica = ContextVar('use_replica', default=False)
+_wrote = ContextVar('wrote', default=False)
+# app_label модели, которой DatabaseCache (CACHE_URL=db) читает и пишет
+# свою таблицу.
+CACHE_APP_LABEL = 'django_cache'
+
+
+@contextmanager
+def use_replica():
+    """Чтения внутри блока уходят на случайную реплику."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def track_writes():
+    """Отмечает, была ли внутри блока запись в основную базу."""
+    token = _wrote.set(False)
+    try:
+        yield _wrote.get
+    finally:
+        _wrote.reset(token)
+
+
+def replica_reads(view):
+    """Помечает представление только для чтения.
+
+    Саму маршрутизацию включает ReplicaRoutingMiddleware, если запрос
+    безопасный и пользователь недавно ничего не записывал.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        return view(*args, **kwargs)
+    wrapped.replica_reads = True
+    return wrapped
+
+
+def pinned_until(request):
+    try:
+        return float(request.COOKIES.get(settings.DATABASE_PIN_COOKIE, 0))
+    except ValueError:
+        return 0.0
+
+
+def is_pinned(request):
+    return pinned_until(request) > time.time()
+
+
+def is_cache_model(model):
+    return model._meta.app_label == CACHE_APP_LABEL
+
+
+class ReplicaRouter:
+    """Чтения в помеченных представлениях — на реплики, остальное — в default.
+
+    Реплики — копии default, поэтому связи между объектами разрешены,
+    а миграции применяются только к основной базе. Таблица DatabaseCache
+    всегда в default, и запись в неё не закрепляет пользователя за
+    основной базой: кэш пишется и при чтении страниц.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not is_cache_model(model):
+            if settings.DATABASE_REPLICAS:
+                return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if not is_cache_model(model):
+            _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def close_unusable_connections(**kwargs):
+    """Проверка живости постоянных соединений перед запросом.
+
+    При CONN_MAX_AGE соединение переживает запрос; если сервер БД за это
+    время его разорвал, запрос упал бы на первом же обращении.
+    """
+    if not settings.DATABASE_HEALTH_CHECKS:
+        return
+    for conn in connections.all():
+        if conn.connection is not None and not conn.is_usable():
+            conn.close()
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Включает SQLITE_PRAGMAS на каждом новом соединении с SQLite."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def retry_on_locked(view):
+    """Повторяет представление, если SQLite ответил «database is locked».
+
+    busy_timeout не помогает, когда транзакция, начатая чтением, пытается
+    стать пишущей при занятой базе: SQLite сразу возвращает SQLITE_BUSY.
+    Тогда вся транзакция откатывается и выполняется заново с паузой.
+    Декоратор ставится снаружи transaction.atomic. Повторяемая функция
+    не должна писать ничего, кроме базы: откат не удалит, например,
+    сохранённые файлы.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        delay = settings.SQLITE_RETRY_DELAY
+        for attempt in range(settings.SQLITE_RETRY_ATTEMPTS):
+            try:
+                return view(*args, **kwargs)
+            except OperationalError as error:
+                last = attempt == settings.SQLITE_RETRY_ATTEMPTS - 1
+                if last or not is_locked(error):
+                    raise
+            time.sleep(delay * (1 + random.random()))
+            delay *= 2
+    return wrapped
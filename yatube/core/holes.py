@@ -0,0 +1,124 @@
+import base64
+import json
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+
+from . import cache, streaming
+
+HOLE_RE = re.compile(r'<!--hole:([A-Za-z0-9_\-=]+)-->')
+SHELL_METHODS = ('GET', 'HEAD')
+
+_providers = {}
+
+
+def provider(template_name):
+    """Регистрирует функцию, дающую контекст фрагмента по запросу."""
+    def decorator(func):
+        _providers[template_name] = func
+        return func
+    return decorator
+
+
+def render_hole(request, template_name, args):
+    context = dict(args)
+    if template_name in _providers:
+        context.update(_providers[template_name](request, **args))
+    return render_to_string(template_name, context, request=request)
+
+
+def punching(request):
+    return getattr(request, '_punch_holes', False)
+
+
+def marker(template_name, args):
+    payload = json.dumps([template_name, args], separators=(',', ':'))
+    return '<!--hole:{}-->'.format(
+        base64.urlsafe_b64encode(payload.encode()).decode()
+    )
+
+
+def fill_holes(shell, request):
+    """Подставляет в общую страницу фрагменты текущего пользователя."""
+    def replace(match):
+        template_name, args = json.loads(
+            base64.urlsafe_b64decode(match.group(1))
+        )
+        return render_hole(request, template_name, args)
+    return HOLE_RE.sub(replace, shell)
+
+
+class _Uncacheable(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def cacheable(request, params):
+    """Можно ли отдать запрос из кэша каркасов.
+
+    Запросы с другими параметрами или повторами не кэшируются, иначе
+    мусорные ?x=1, ?x=2... заполняли бы кэш.
+    """
+    if request.method not in SHELL_METHODS or streaming.enabled(request):
+        return False
+    query = request.GET
+    return not set(query) - set(params) and all(
+        len(query.getlist(name)) == 1 for name in query
+    )
+
+
+def shell_key(request, params, version):
+    """Ключ каркаса: путь и params в постоянном порядке."""
+    values = [(name, request.GET[name]) for name in params
+              if name in request.GET]
+    return 'page_shell:{}?{}:{}'.format(
+        request.path, urlencode(values), version.timestamp()
+    )
+
+
+def cache_shell(version_func, timeout=None, params=()):
+    """Кэширует страницу один раз для всех пользователей.
+
+    Представление рендерится с «дырами» на месте фрагментов {% hole %}:
+    шапки, кнопок и форм, зависящих от пользователя. Общая часть
+    кэшируется по адресу и версии ресурса, а дыры заполняются на каждый
+    запрос, поэтому из кэша обслуживаются и вошедшие пользователи.
+    Адрес в ключе — путь и параметры params, которые читает
+    представление; с любыми другими параметрами кэш не используется.
+    Без версии (ресурс ещё ни разу не менялся) кэш не используется,
+    как и при потоковом рендере (core.streaming): каркас отдаётся сразу.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not cacheable(request, params):
+                return view(request, *args, **kwargs)
+            version = version_func(request, *args, **kwargs)
+            if version is None:
+                return view(request, *args, **kwargs)
+            key = shell_key(request, params, version)
+
+            def render_shell():
+                request._punch_holes = True
+                try:
+                    response = view(request, *args, **kwargs)
+                finally:
+                    request._punch_holes = False
+                if response.status_code != 200 or response.streaming:
+                    raise _Uncacheable(response)
+                return response.content.decode(response.charset)
+
+            try:
+                shell = cache.get_or_set(
+                    key, render_shell,
+                    timeout or settings.PAGE_SHELL_CACHE_TIMEOUT,
+                )
+            except _Uncacheable as uncacheable:
+                return uncacheable.response
+            return HttpResponse(fill_holes(shell, request))
+        return wrapped
+    return decorator
@@ -0,0 +1,223 @@
+"""Метрики производительности запросов в текстовом формате Prometheus.
+
+MetricsMiddleware замеряет выборку запросов (METRICS_SAMPLE_RATE) и
+складывает по имени маршрута время ответа, число и время SQL-запросов,
+время рендера шаблонов и обращения к кэшу. Гистограммы живут в памяти
+процесса: при нескольких воркерах Prometheus опрашивает каждый из них.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_sample = ContextVar('metrics_sample', default=None)
+
+
+class Sample:
+    """Счётчики одного замеряемого запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def sampling(sample=None):
+    """Замер запроса; sample — продолжить начатый (потоковый ответ)."""
+    if sample is None:
+        sample = Sample()
+    token = _sample.set(sample)
+    try:
+        yield sample
+    finally:
+        _sample.reset(token)
+
+
+@contextmanager
+def timing_template():
+    """Время рендера; вложенные рендеры (фрагменты) не считаются дважды."""
+    sample = _sample.get()
+    if sample is None:
+        yield
+        return
+    sample.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.template_depth -= 1
+        if not sample.template_depth:
+            sample.template_time += time.perf_counter() - started
+
+
+def cache_lookups(hits=0, misses=0):
+    sample = _sample.get()
+    if sample is not None:
+        sample.cache_hits += hits
+        sample.cache_misses += misses
+
+
+def _escape(value):
+    return (str(value).replace('\\', r'\\').replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+def _labels(names, values, extra=''):
+    pairs = [
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, values, amount=1):
+        with self.lock:
+            self.series[values] = self.series.get(values, 0) + amount
+
+    def samples(self):
+        for values, total in sorted(self.series.items()):
+            yield f'{self.name}{_labels(self.labels, values)} {total}'
+
+
+class Histogram(Counter):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels, buckets):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, values, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(values)
+            if series is None:
+                series = self.series[values] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0,
+                ]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        for values, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float('inf'),), counts):
+                cumulative += hits
+                labels = _labels(self.labels, values,
+                                 f'le="{_number(bound)}"')
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _labels(self.labels, values)
+            yield f'{self.name}_sum{labels} {_number(total)}'
+            yield f'{self.name}_count{labels} {count}'
+
+
+class Registry:
+    def __init__(self):
+        seconds = settings.METRICS_DURATION_BUCKETS
+        self.requests = Counter(
+            'yatube_requests_total', 'Замеренные запросы.',
+            ('view', 'method', 'status'),
+        )
+        self.duration = Histogram(
+            'yatube_request_duration_seconds', 'Время ответа.',
+            ('view',), seconds,
+        )
+        self.queries = Histogram(
+            'yatube_db_queries', 'SQL-запросов на ответ.',
+            ('view',), settings.METRICS_QUERY_BUCKETS,
+        )
+        self.db_time = Histogram(
+            'yatube_db_duration_seconds', 'Время SQL-запросов на ответ.',
+            ('view',), seconds,
+        )
+        self.template_time = Histogram(
+            'yatube_template_duration_seconds', 'Время рендера шаблонов.',
+            ('view',), seconds,
+        )
+        self.cache = Counter(
+            'yatube_cache_lookups_total', 'Обращения к кэшу по ключам.',
+            ('view', 'result'),
+        )
+
+    def record(self, view, method, status, duration, sample):
+        labels = (view,)
+        self.requests.inc((view, method, str(status)))
+        self.duration.observe(labels, duration)
+        self.queries.observe(labels, sample.queries)
+        self.db_time.observe(labels, sample.db_time)
+        self.template_time.observe(labels, sample.template_time)
+        if sample.cache_hits:
+            self.cache.inc((view, 'hit'), sample.cache_hits)
+        if sample.cache_misses:
+            self.cache.inc((view, 'miss'), sample.cache_misses)
+
+    def metrics(self):
+        return (self.requests, self.duration, self.queries, self.db_time,
+                self.template_time, self.cache)
+
+    def render(self):
+        lines = [
+            '# HELP yatube_metrics_sample_rate Доля замеряемых запросов.',
+            '# TYPE yatube_metrics_sample_rate gauge',
+            f'yatube_metrics_sample_rate '
+            f'{_number(float(settings.METRICS_SAMPLE_RATE))}',
+        ]
+        for metric in self.metrics():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            with metric.lock:
+                lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = Registry()
+    return _registry
+
+
+def reset():
+    """Сбрасывает накопленные метрики (для тестов)."""
+    global _registry
+    _registry = None
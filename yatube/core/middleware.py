@@ -0,0 +1,99 @@
+import random
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+from .db import is_pinned, track_writes, use_replica
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """Направляет чтения на реплики и закрепляет автора записи за default.
+
+    После любой записи пользователь получает cookie со сроком
+    DATABASE_PIN_SECONDS: пока она действует, его чтения идут в основную
+    базу, и он видит свои изменения, даже если реплика отстаёт.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with track_writes() as wrote, ExitStack() as stack:
+            request._replica_stack = stack
+            response = self.get_response(request)
+            if wrote():
+                pin_until = time.time() + settings.DATABASE_PIN_SECONDS
+                response.set_cookie(
+                    settings.DATABASE_PIN_COOKIE, f'{pin_until:.3f}',
+                    max_age=settings.DATABASE_PIN_SECONDS, httponly=True,
+                    samesite='Lax',
+                )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            getattr(view_func, 'replica_reads', False)
+            and request.method in SAFE_METHODS
+            and not is_pinned(request)
+        ):
+            request._replica_stack.enter_context(use_replica())
+
+
+class MetricsMiddleware:
+    """Замеряет долю METRICS_SAMPLE_RATE запросов для core.metrics.
+
+    Выключенная (METRICS_ENABLED = False) исключается из цепочки ещё при
+    загрузке и ничего не стоит.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        started = time.perf_counter()
+        with self.sampling() as sample:
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, response, started,
+                sample,
+            )
+        else:
+            self.record(request, response, started, sample)
+        return response
+
+    @contextmanager
+    def sampling(self, sample=None):
+        with metrics.sampling(sample) as sample, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(sample.execute))
+            yield sample
+
+    def stream(self, content, request, response, started, sample):
+        """Потоковый ответ (core.streaming) замеряется до последнего куска.
+
+        Запросы к БД и рендер лент выполняются уже при отправке, после
+        выхода из middleware.
+        """
+        try:
+            with self.sampling(sample):
+                yield from content
+        finally:
+            self.record(request, response, started, sample)
+
+    def record(self, request, response, started, sample):
+        match = request.resolver_match
+        metrics.registry().record(
+            match.view_name if match else 'unresolved', request.method,
+            response.status_code, time.perf_counter() - started, sample,
+        )
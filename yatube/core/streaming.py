@@ -0,0 +1,89 @@
+"""Потоковый рендер страниц (STREAMING_FEEDS).
+
+Страница сначала рендерится «каркасом»: тяжёлые места отмечены тегом
+{% deferred %} и карточками постов, вместо них остаются метки. Каркас
+без выборки постов отдаётся сразу — браузер получает <head> со стилями
+и шапку и начинает загружать статику. Затем метки раскрываются по
+очереди, каждая отдельным куском ответа.
+
+Куски готовятся уже после выхода из представления и middleware,
+поэтому генератор выполняется в контексте (contextvars) представления:
+чтения по-прежнему уходят на реплику. Ошибка после первого куска
+обрывает ответ: статус 200 к этому моменту уже отправлен.
+"""
+import contextvars
+import re
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import render as render_page
+from django.template import loader
+from django.utils.safestring import mark_safe
+
+STREAM_RE = re.compile(r'<!--stream:(\d+)-->')
+STREAM_METHODS = ('GET', 'HEAD')
+CONTEXT_KEY = '_stream'
+
+
+class Stream:
+    """Отложенные части одной страницы."""
+
+    def __init__(self):
+        self.sections = {}
+
+    def defer(self, render):
+        """Метка на месте render(); render вызывается при отправке."""
+        number = len(self.sections)
+        self.sections[number] = render
+        return mark_safe(f'<!--stream:{number}-->')
+
+    def expand(self, text):
+        """Куски text, где каждая метка заменена своей частью.
+
+        Части сами могут содержать метки, они раскрываются на месте.
+        """
+        position = 0
+        for match in STREAM_RE.finditer(text):
+            if match.start() > position:
+                yield text[position:match.start()]
+            render = self.sections.pop(int(match.group(1)))
+            yield from self.expand(render())
+            position = match.end()
+        if position < len(text):
+            yield text[position:]
+
+
+def enabled(request):
+    return settings.STREAMING_FEEDS and request.method in STREAM_METHODS
+
+
+def current(context):
+    """Stream рендера или None, если страница рендерится целиком."""
+    return context.get(CONTEXT_KEY)
+
+
+def _run_in(context, chunks):
+    while True:
+        chunk = context.run(next, chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def render(request, template_name, context):
+    """render() для лент: потоковый ответ, если он включён.
+
+    Без STREAMING_FEEDS ответ тот же, что у django.shortcuts.render.
+    """
+    if not enabled(request):
+        return render_page(request, template_name, context)
+    template = loader.get_template(template_name)
+    stream = Stream()
+
+    def chunks():
+        shell = template.render({**context, CONTEXT_KEY: stream}, request)
+        yield from stream.expand(shell)
+
+    return StreamingHttpResponse(
+        _run_in(contextvars.copy_context(), chunks())
+    )
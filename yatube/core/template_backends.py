@@ -0,0 +1,45 @@
+import os
+
+from django.template import TemplateDoesNotExist, engines
+from django.template.backends import django
+
+from . import metrics
+
+
+class Template(django.Template):
+    def render(self, context=None, request=None):
+        with metrics.timing_template():
+            return super().render(context, request)
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    """Стандартный движок, замеряющий время рендера для core.metrics."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django.reraise(exc, self)
+
+
+def warm_up():
+    """Загружает все шаблоны из DIRS, чтобы их разобрал cached.Loader.
+
+    Вызывается при старте воркера (TEMPLATE_WARMUP): первый запрос после
+    выкладки не тратит время на разбор. Возвращает число шаблонов.
+    """
+    count = 0
+    for backend in engines.all():
+        if not isinstance(backend, django.DjangoTemplates):
+            continue
+        for directory in backend.engine.dirs:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    path = os.path.relpath(os.path.join(root, name),
+                                           directory)
+                    backend.engine.get_template(path.replace(os.sep, '/'))
+                    count += 1
+    return count
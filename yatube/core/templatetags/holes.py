@@ -0,0 +1,19 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.holes import marker, punching, render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **args):
+    """Фрагмент, который рендерится для каждого пользователя отдельно.
+
+    При рендере общей страницы для кэша вместо фрагмента остаётся метка,
+    иначе он рендерится сразу. Аргументы должны сериализоваться в JSON.
+    """
+    request = context.get('request')
+    if request is not None and punching(request):
+        return mark_safe(marker(template_name, args))
+    return mark_safe(render_hole(request, template_name, args))
@@ -0,0 +1,32 @@
+from django import template
+
+from core.streaming import current
+
+register = template.Library()
+
+
+class DeferredNode(template.Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        stream = current(context)
+        if stream is None:
+            return self.nodelist.render(context)
+        # Контекст меняется дальше по шаблону: часть рендерится со
+        # снимком на момент метки.
+        snapshot = context.new(context.flatten())
+        return stream.defer(lambda: self.nodelist.render(snapshot))
+
+
+@register.tag
+def deferred(parser, token):
+    """Часть страницы, которую при потоковом рендере можно отправить позже.
+
+    {% deferred %}...{% enddeferred %}. Внутри — всё, что требует
+    выборок из базы: при потоковом рендере каркас страницы уходит
+    клиенту до них. Без потокового рендера часть рендерится на месте.
+    """
+    nodelist = parser.parse(('enddeferred',))
+    parser.delete_first_token()
+    return DeferredNode(nodelist)
@@ -0,0 +1,431 @@
+import asyncio
+import copy
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.core.cache.backends.db import DatabaseCache
+from django.db import OperationalError, connection, router
+from django.template import engines
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core import cache, metrics
+from core.asgi import ASGIHandler
+from core.db import (
+    apply_sqlite_pragmas, close_unusable_connections, replica_reads,
+    retry_on_locked,
+)
+from core.middleware import ReplicaRoutingMiddleware
+from core.template_backends import warm_up
+from posts.models import Post
+
+User = get_user_model()
+
+FILE_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(),
+    }
+}
+
+
+@override_settings(CACHES=FILE_CACHE)
+class SharedCacheTest(TestCase):
+    def setUp(self):
+        django_cache.clear()
+
+    def test_get_or_set_computes_once(self):
+        factory = mock.Mock(return_value='значение')
+        self.assertEqual(cache.get_or_set('key', factory, 60), 'значение')
+        self.assertEqual(cache.get_or_set('key', factory, 60), 'значение')
+        factory.assert_called_once()
+
+    def test_stale_value_served_while_locked(self):
+        """Пока ключ пересчитывает другой воркер, отдаётся старое значение."""
+        cache.get_or_set('key', lambda: 'старое', 60)
+        django_cache.add('key:lock', 1)
+        factory = mock.Mock(return_value='новое')
+        with mock.patch('core.cache._is_fresh', return_value=False):
+            self.assertEqual(cache.get_or_set('key', factory, 60), 'старое')
+        factory.assert_not_called()
+
+    @override_settings(CACHE_LOCK_WAIT=0.2)
+    def test_waiter_falls_back_to_factory(self):
+        django_cache.add('key:lock', 1)
+        self.assertEqual(cache.get_or_set('key', lambda: 'своё', 60), 'своё')
+
+    def test_lock_taken_over_is_not_released(self):
+        """Блокировку, истёкшую за долгий пересчёт, не снимаем у другого."""
+        def slow_factory():
+            django_cache.set('key:lock', 'чужая')
+            return 'значение'
+
+        cache.get_or_set('key', slow_factory, 60)
+        self.assertEqual(django_cache.get('key:lock'), 'чужая')
+        cache.get_or_set('other', lambda: 'значение', 60)
+        self.assertIsNone(django_cache.get('other:lock'))
+
+    def test_fill_many_after_get_many(self):
+        """Промахи считаются один раз, кэш повторно не читается."""
+        cache.set_many({'a': 'старое'}, 60)
+        stale = {}
+        with metrics.sampling() as sample, \
+                mock.patch('core.cache._is_fresh', return_value=False):
+            self.assertEqual(cache.get_many(['a', 'b'], stale=stale), {})
+            with mock.patch.object(
+                django_cache, 'get', wraps=django_cache.get
+            ) as get:
+                values = cache.fill_many(
+                    {'a': lambda: 'новое', 'b': lambda: 'b'}, 60, stale
+                )
+        # Читаются только блокировки — проверить, что они ещё свои.
+        self.assertEqual(
+            {call.args[0] for call in get.call_args_list}, {'a:lock', 'b:lock'}
+        )
+        self.assertEqual(values, {'a': 'новое', 'b': 'b'})
+        self.assertEqual((sample.cache_hits, sample.cache_misses), (0, 2))
+        self.assertEqual(cache.get_many(['a', 'b']), values)
+
+    def test_early_expiration_near_deadline(self):
+        fresh = ('значение', 1.0, 10 ** 12)
+        expiring = ('значение', 1.0, 0)
+        self.assertTrue(cache._is_fresh(fresh, beta=1.0))
+        self.assertFalse(cache._is_fresh(expiring, beta=1.0))
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = []
+
+        @replica_reads
+        def read_view(request):
+            self.seen.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        def write_view(request):
+            self.seen.append(router.db_for_write(Post))
+            return HttpResponse()
+
+        self.read_view, self.write_view = read_view, write_view
+
+    def call(self, view, request):
+        def handler(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = ReplicaRoutingMiddleware(handler)
+        return middleware(request)
+
+    def test_reads_go_to_replicas(self):
+        response = self.call(self.read_view, self.factory.get('/'))
+        self.assertIn(self.seen[0], ['replica1', 'replica2'])
+        self.assertNotIn(settings.DATABASE_PIN_COOKIE, response.cookies)
+
+    def test_unmarked_views_and_posts_use_primary(self):
+        self.call(self.write_view, self.factory.get('/'))
+        self.call(self.read_view, self.factory.post('/'))
+        self.assertEqual(self.seen, ['default', 'default'])
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_reads_pinned_after_write(self):
+        """После записи свои чтения пользователь делает из default."""
+        response = self.call(self.write_view, self.factory.post('/'))
+        pin = response.cookies[settings.DATABASE_PIN_COOKIE]
+        request = self.factory.get('/')
+        request.COOKIES[settings.DATABASE_PIN_COOKIE] = pin.value
+        self.call(self.read_view, request)
+        self.assertEqual(self.seen, ['default', 'default'])
+
+    def test_pin_expires(self):
+        request = self.factory.get('/')
+        request.COOKIES[settings.DATABASE_PIN_COOKIE] = str(time.time() - 1)
+        self.call(self.read_view, request)
+        self.assertNotEqual(self.seen[0], 'default')
+
+    def test_database_cache_does_not_pin(self):
+        """Запись в кэш-таблицу (CACHE_URL=db) — не запись пользователя."""
+        entry = DatabaseCache('yatube_cache', {}).cache_model_class
+
+        @replica_reads
+        def view(request):
+            self.seen.append(router.db_for_read(entry))
+            self.seen.append(router.db_for_write(entry))
+            return HttpResponse()
+
+        response = self.call(view, self.factory.get('/'))
+        self.assertEqual(self.seen, ['default', 'default'])
+        self.assertNotIn(settings.DATABASE_PIN_COOKIE, response.cookies)
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+        self.assertFalse(router.allow_migrate('replica1', 'posts'))
+
+    def test_unusable_connection_closed(self):
+        conn = mock.Mock(connection=object())
+        conn.is_usable.return_value = False
+        with mock.patch('core.db.connections.all', return_value=[conn]):
+            close_unusable_connections()
+        conn.close.assert_called_once()
+
+
+class SQLiteTuningTest(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -4096})
+    def test_pragmas_applied_to_new_connection(self):
+        apply_sqlite_pragmas(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -4096)
+
+    @override_settings(SQLITE_RETRY_ATTEMPTS=3, SQLITE_RETRY_DELAY=0)
+    def test_retry_on_locked(self):
+        view = mock.Mock(side_effect=[
+            OperationalError('database is locked'), 'ответ',
+        ])
+        self.assertEqual(retry_on_locked(view)(), 'ответ')
+        self.assertEqual(view.call_count, 2)
+
+    @override_settings(SQLITE_RETRY_ATTEMPTS=3, SQLITE_RETRY_DELAY=0)
+    def test_retry_gives_up(self):
+        locked = mock.Mock(side_effect=OperationalError('database is locked'))
+        with self.assertRaises(OperationalError):
+            retry_on_locked(locked)()
+        self.assertEqual(locked.call_count, 3)
+        other = mock.Mock(side_effect=OperationalError('no such table'))
+        with self.assertRaises(OperationalError):
+            retry_on_locked(other)()
+        other.assert_called_once()
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_SAMPLE_RATE=1.0,
+                   METRICS_TOKEN='')
+class MetricsTest(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def scrape(self, **headers):
+        response = self.client.get(reverse('metrics'), **headers)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_request_recorded_per_url_name(self):
+        self.client.get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertIn('yatube_requests_total{view="posts:index",'
+                      'method="GET",status="200"} 1', text)
+        self.assertIn('yatube_request_duration_seconds_count'
+                      '{view="posts:index"} 1', text)
+        self.assertIn('yatube_template_duration_seconds_count'
+                      '{view="posts:index"} 1', text)
+        self.assertIn('yatube_db_queries_bucket{view="posts:index",'
+                      'le="+Inf"} 1', text)
+        self.assertIn('yatube_cache_lookups_total{view="posts:index",'
+                      'result="miss"}', text)
+
+    def test_streamed_response_recorded_after_last_chunk(self):
+        """Запросы и рендер потоковой ленты попадают в замер запроса."""
+        Post.objects.create(
+            author=User.objects.create_user(username='author'), text='Пост'
+        )
+        executed = []
+
+        def count(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        with override_settings(STREAMING_FEEDS=True), \
+                connection.execute_wrapper(count):
+            response = self.client.get(reverse('posts:index'))
+            before_body = len(executed)
+            self.assertNotIn('posts:index', self.scrape())
+            b''.join(response.streaming_content)
+        self.assertGreater(len(executed), before_body)
+        text = self.scrape()
+        self.assertIn('yatube_requests_total{view="posts:index",'
+                      'method="GET",status="200"} 1', text)
+        self.assertIn('yatube_db_queries_sum{view="posts:index"} '
+                      f'{float(len(executed))}', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('h', 'Тест.', ('view',), (1, 5))
+        for value in (0, 3, 3, 7):
+            histogram.observe(('v',), value)
+        self.assertEqual(list(histogram.samples()), [
+            'h_bucket{view="v",le="1"} 1',
+            'h_bucket{view="v",le="5"} 3',
+            'h_bucket{view="v",le="+Inf"} 4',
+            'h_sum{view="v"} 13.0',
+            'h_count{view="v"} 4',
+        ])
+
+    @override_settings(METRICS_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_not_recorded(self):
+        self.client.get(reverse('posts:index'))
+        self.assertNotIn('posts:index', self.scrape())
+
+    @override_settings(METRICS_TOKEN='token')
+    def test_token_required(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 401)
+        self.scrape(HTTP_AUTHORIZATION='Bearer token')
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        self.assertEqual(metrics.registry().requests.series, {})
+
+
+CACHED_TEMPLATES = copy.deepcopy(settings.TEMPLATES)
+CACHED_TEMPLATES[0]['APP_DIRS'] = False
+CACHED_TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+
+@override_settings(TEMPLATES=CACHED_TEMPLATES)
+class TemplateWarmUpTest(TestCase):
+    def test_project_templates_loaded_at_boot(self):
+        count = warm_up()
+        loader = engines.all()[0].engine.template_loaders[0]
+        self.assertEqual(count, len(loader.get_template_cache))
+        self.assertIn('base.html', loader.get_template_cache)
+        self.assertIn('posts/includes/post_card.html',
+                      loader.get_template_cache)
+
+    def test_pages_render_from_cache(self):
+        warm_up()
+        self.assertEqual(
+            self.client.get(reverse('posts:index')).status_code, 200
+        )
+
+
+def run_asgi(application, scope, body=b'', disconnect_after=None):
+    """Сообщения ответа; после disconnect_after из них клиент уходит."""
+    messages = [
+        {'type': 'http.request', 'body': body[:3], 'more_body': True},
+        {'type': 'http.request', 'body': body[3:]},
+    ]
+    sent = []
+    gone = None
+
+    async def receive():
+        nonlocal gone
+        if messages:
+            return messages.pop(0)
+        gone = gone or asyncio.Event()
+        await gone.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+        if len(sent) == disconnect_after:
+            gone.set()
+
+    asyncio.run(application({'type': 'http', **scope}, receive, send))
+    return sent
+
+
+class ASGIHandlerTest(TestCase):
+    def test_wsgi_environ_and_chunks(self):
+        seen = {}
+
+        def application(environ, start_response):
+            seen.update(environ)
+            seen['body'] = environ['wsgi.input'].read()
+            start_response('201 Created', [('Content-Type', 'text/plain')])
+            return iter([b'a', b'', b'b'])
+
+        sent = run_asgi(ASGIHandler(application, threads=2), {
+            'method': 'POST', 'path': '/путь/', 'query_string': b'q=1',
+            'headers': [(b'content-type', b'text/plain'),
+                        (b'x-token', b'1'), (b'x-token', b'2')],
+        }, body=b'hello')
+        self.assertEqual(seen['body'], b'hello')
+        self.assertEqual(seen['PATH_INFO'], '/путь/'.encode().decode('latin1'))
+        self.assertEqual(seen['QUERY_STRING'], 'q=1')
+        self.assertEqual(seen['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(seen['HTTP_X_TOKEN'], '1,2')
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertEqual(sent[0]['headers'],
+                         [(b'content-type', b'text/plain')])
+        self.assertEqual([message['body'] for message in sent[1:]],
+                         [b'a', b'b', b''])
+
+    def test_response_iterated_and_closed_in_one_thread(self):
+        threads = set()
+
+        class Response:
+            def __iter__(self):
+                for chunk in (b'a', b'b', b'c'):
+                    threads.add(threading.get_ident())
+                    yield chunk
+
+            def close(self):
+                threads.add(threading.get_ident())
+
+        def application(environ, start_response):
+            threads.add(threading.get_ident())
+            start_response('200 OK', [])
+            return Response()
+
+        sent = run_asgi(ASGIHandler(application, threads=4), {
+            'method': 'GET', 'path': '/',
+        })
+        self.assertEqual(len(threads), 1)
+        self.assertEqual(b''.join(message['body'] for message in sent[1:]),
+                         b'abc')
+
+    def test_disconnect_stops_iteration(self):
+        produced = []
+        closed = threading.Event()
+
+        class Handler(ASGIHandler):
+            def respond(self, environ, emit, cancelled):
+                self.cancelled = cancelled
+                return super().respond(environ, emit, cancelled)
+
+        class Response:
+            def __iter__(self):
+                for number in range(3):
+                    produced.append(number)
+                    yield b'x'
+                    # Следующий кусок — только после отключения клиента.
+                    handler.cancelled.wait(timeout=5)
+
+            def close(self):
+                closed.set()
+
+        def application(environ, start_response):
+            start_response('200 OK', [])
+            return Response()
+
+        handler = Handler(application, threads=1)
+        sent = run_asgi(handler, {
+            'method': 'GET', 'path': '/',
+        }, disconnect_after=2)
+        self.assertTrue(closed.is_set())
+        self.assertEqual(produced, [0, 1])
+        self.assertEqual(len(sent), 2)
+
+    def test_django_page(self):
+        from yatube.wsgi import application
+
+        sent = run_asgi(ASGIHandler(application, threads=2), {
+            'method': 'GET', 'path': reverse('about:author'),
+        })
+        self.assertEqual(sent[0]['status'], 200)
+        body = b''.join(message['body'] for message in sent[1:])
+        self.assertIn(b'</html>', body)
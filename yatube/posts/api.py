@@ -0,0 +1,266 @@
+"""JSON API v1: ленты, посты, комментарии и подписки.
+
+Ответ содержит только запрошенные поля (?fields=id,text), выборка
+читает только нужные для них колонки, а JSON пишется без пробелов и
+\\u-экранирования кириллицы. Ленты листаются тем же курсором, что и
+HTML-страницы, а ETag/Last-Modified берутся из posts.versions.
+Авторизация — сессия сайта; для POST и DELETE нужен заголовок
+X-CSRFToken.
+"""
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_http_methods
+
+from core.db import replica_reads
+
+from . import groups
+from .models import Follow, Post
+from .timeline import timeline_sources
+from .utils import get_comment_page, get_page_obj
+from .versions import (
+    GROUPS_KEY, conditional, group_keys, index_keys, post_detail_keys,
+    profile_keys,
+)
+
+User = get_user_model()
+
+BATCH_MAX_IDS = 100
+# Ключи — 64-битные целые SQLite.
+MAX_ID = 2 ** 63 - 1
+JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def _group_slug(post):
+    if post.group_id is None:
+        return None
+    group = groups.get_by_id(post.group_id)
+    return group.slug if group else None
+
+
+# Поле ответа -> (колонки выборки, значение).
+POST_FIELDS = {
+    'id': (('id',), lambda post: post.pk),
+    'text': (('text',), lambda post: post.text),
+    'pub_date': (('pub_date',), lambda post: post.pub_date.isoformat()),
+    'updated': (('updated',), lambda post: post.updated.isoformat()),
+    'author': (('author__username',), lambda post: post.author.username),
+    'group': (('group_id',), _group_slug),
+    'image': (('image',), lambda post: post.image.url if post.image else None),
+    # URL миниатюры строит хранилище поля image.
+    'thumbnail': (('thumbnail', 'image'),
+                  lambda post: post.thumbnail_url or None),
+    'comments_count': (('comments_count',),
+                       lambda post: post.comments_count),
+}
+# Комментарий меняет версию поста, но не версии лент, поэтому в лентах
+# числа комментариев нет.
+FEED_FIELDS = tuple(name for name in POST_FIELDS if name != 'comments_count')
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'author': lambda comment: comment.author.username,
+    'text': lambda comment: comment.text,
+    'pub_date': lambda comment: comment.pub_date.isoformat(),
+}
+
+
+class APIError(Exception):
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def respond(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def api_view(view):
+    """Ошибки API отдаются JSON-ом {"detail": ...}, а не HTML-страницей."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except APIError as error:
+            return respond({'detail': error.detail}, error.status)
+        except Http404:
+            return respond({'detail': 'Не найдено'}, 404)
+    return wrapped
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            raise APIError('Нужна авторизация', 401)
+        return view(request, *args, **kwargs)
+    return wrapped
+
+
+def requested_fields(request, allowed):
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(allowed)
+    names = list(dict.fromkeys(filter(None, raw.split(','))))
+    unknown = set(names) - set(allowed)
+    if unknown:
+        raise APIError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return names
+
+
+def post_queryset(queryset, names):
+    """Только колонки запрошенных полей; id и pub_date нужны курсору."""
+    columns = {'id', 'pub_date'}
+    for name in names:
+        columns.update(POST_FIELDS[name][0])
+    if 'author' in names:
+        queryset = queryset.select_related('author')
+    return queryset.only(*columns)
+
+
+def post_data(post, names):
+    return {name: POST_FIELDS[name][1](post) for name in names}
+
+
+def comment_data(comment, names=tuple(COMMENT_FIELDS)):
+    return {name: COMMENT_FIELDS[name](comment) for name in names}
+
+
+def next_url(request, page):
+    if not page.has_next():
+        return None
+    query = request.GET.copy()
+    query.pop('page', None)
+    query['cursor'] = page.next_cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def feed(request, queryset, sources=None):
+    names = requested_fields(request, FEED_FIELDS)
+    page = get_page_obj(
+        request, post_queryset(queryset, names), sources=sources
+    )
+    return respond({
+        'results': [post_data(post, names) for post in page],
+        'next_cursor': page.next_cursor,
+        'next': next_url(request, page),
+    })
+
+
+def batch_ids(request):
+    raw = request.GET.get('ids')
+    if raw is None:
+        return None
+    try:
+        ids = list(dict.fromkeys(int(pk) for pk in raw.split(',') if pk))
+    except ValueError:
+        raise APIError('ids — список чисел через запятую')
+    if not ids or len(ids) > BATCH_MAX_IDS:
+        raise APIError(f'ids: от 1 до {BATCH_MAX_IDS} значений')
+    if not all(0 < pk <= MAX_ID for pk in ids):
+        raise APIError(f'ids: числа от 1 до {MAX_ID}')
+    return ids
+
+
+def post_list_keys(request):
+    ids = batch_ids(request)
+    if ids is None:
+        return index_keys()
+    return [f'post:{pk}' for pk in ids] + [GROUPS_KEY]
+
+
+@api_view
+@replica_reads
+@require_GET
+@conditional(post_list_keys, with_request=True)
+def post_list(request):
+    """Главная лента или, с ?ids=1,2,3, сразу несколько постов по id."""
+    ids = batch_ids(request)
+    if ids is None:
+        return feed(request, Post.objects.all())
+    names = requested_fields(request, POST_FIELDS)
+    posts = post_queryset(Post.objects.all(), names).in_bulk(ids)
+    return respond({
+        'results': [post_data(posts[pk], names) for pk in ids if pk in posts],
+        'missing': [pk for pk in ids if pk not in posts],
+    })
+
+
+@api_view
+@replica_reads
+@require_GET
+@conditional(group_keys)
+def group_posts(request, slug):
+    group = groups.get_by_slug(slug)
+    if group is None:
+        raise Http404
+    return feed(request, Post.objects.filter(group=group))
+
+
+@api_view
+@replica_reads
+@require_GET
+@conditional(profile_keys)
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed(request, Post.objects.filter(author=author))
+
+
+@api_view
+@api_login_required
+@replica_reads
+@require_GET
+def follow_posts(request):
+    return feed(
+        request, Post.objects.all(), sources=timeline_sources(request.user)
+    )
+
+
+@api_view
+@replica_reads
+@require_GET
+@conditional(post_detail_keys)
+def post_detail(request, post_id):
+    names = requested_fields(request, POST_FIELDS)
+    post = get_object_or_404(post_queryset(Post.objects.all(), names),
+                             pk=post_id)
+    return respond(post_data(post, names))
+
+
+@api_view
+@replica_reads
+@require_GET
+@conditional(post_detail_keys)
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    names = requested_fields(request, COMMENT_FIELDS)
+    page = get_comment_page(post_id, request.GET.get('cursor'))
+    return respond({
+        'results': [comment_data(comment, names) for comment in page],
+        'next_cursor': page.next_cursor,
+        'next': next_url(request, page),
+    })
+
+
+@api_view
+@api_login_required
+@require_http_methods(['POST', 'DELETE'])
+@transaction.atomic
+def follow(request, username):
+    """POST подписывает на автора, DELETE отписывает."""
+    author = get_object_or_404(User, username=username)
+    if author == request.user:
+        raise APIError('Нельзя подписаться на себя')
+    if request.method == 'DELETE':
+        Follow.objects.filter(user=request.user, author=author).delete()
+        return respond({'following': False})
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=request.user, author=author)
+    except IntegrityError:
+        return respond({'following': True})
+    return respond({'following': True}, 201)
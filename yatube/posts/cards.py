@@ -0,0 +1,52 @@
+from functools import partial
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from core import cache
+
+from . import groups
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+def card_key(post):
+    return f'post_card:{post.pk}:{post.updated.timestamp()}'
+
+
+def render_card(post):
+    return render_to_string(CARD_TEMPLATE, {'post': post})
+
+
+def render_cards(posts, defer=None):
+    """Карточки постов из кэша; отсутствующие рендерятся и кэшируются.
+
+    Ключ включает время изменения поста, поэтому правка поста или его
+    группы меняет ключ только этой карточки, а старая запись истекает
+    сама. С defer (core.streaming.Stream.defer) вместо отсутствующих
+    карточек возвращаются метки, и рендерятся они при отправке ответа.
+    """
+    posts = list(posts)
+    keys = [card_key(post) for post in posts]
+    stale = {}
+    cards = cache.get_many(keys, stale=stale)
+    missing = {
+        key: partial(render_card, post)
+        for key, post in zip(keys, posts) if key not in cards
+    }
+    groups.attach(
+        post for key, post in zip(keys, posts) if key in missing
+    )
+    timeout = settings.POST_CARD_CACHE_TIMEOUT
+    if defer is None:
+        cards.update(cache.fill_many(missing, timeout, stale))
+    else:
+        for key, factory in missing.items():
+            cards[key] = defer(partial(
+                _fill_one, key, factory, timeout, stale
+            ))
+    return [cards[key] for key in keys]
+
+
+def _fill_one(key, factory, timeout, stale):
+    return cache.fill_many({key: factory}, timeout, stale)[key]
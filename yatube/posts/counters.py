@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+def _count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def actual_stats(user_id):
+    return {
+        'posts_count': Post.objects.filter(author=user_id).count(),
+        'followers_count': Follow.objects.filter(author=user_id).count(),
+        'following_count': Follow.objects.filter(user=user_id).count(),
+    }
+
+
+def bump_author(user_id, **deltas):
+    """Сдвигает счётчики автора.
+
+    Отсутствующую строку не создаём: при каскадном удалении пользователя
+    она могла быть уже удалена. Её восстановят get_stats или
+    reconcile_counters.
+    """
+    AuthorStats.objects.filter(user_id=user_id).update(
+        **{
+            field: Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items()
+        }
+    )
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def get_stats(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        stats, _ = AuthorStats.objects.get_or_create(
+            user=user, defaults=actual_stats(user.pk)
+        )
+        return stats
+
+
+def _fix_drift(queryset, counters, batch_size=500):
+    drifted = queryset.annotate(
+        **{f'actual_{field}': value for field, value in counters.items()}
+    ).exclude(
+        **{field: F(f'actual_{field}') for field in counters}
+    ).values_list('pk', flat=True)
+    ids = list(drifted.iterator())
+    for start in range(0, len(ids), batch_size):
+        queryset.model.objects.filter(
+            pk__in=ids[start:start + batch_size]
+        ).update(**counters)
+    return len(ids)
+
+
+def reconcile_authors():
+    """Исправляет расхождения в счётчиках авторов, возвращает их число."""
+    missing = User.objects.filter(stats__isnull=True)
+    AuthorStats.objects.bulk_create(
+        AuthorStats(user_id=user_id)
+        for user_id in missing.values_list('pk', flat=True).iterator()
+    )
+    return _fix_drift(AuthorStats.objects.all(), {
+        'posts_count': _count(Post, 'author'),
+        'followers_count': _count(Follow, 'author'),
+        'following_count': _count(Follow, 'user'),
+    })
+
+
+def reconcile_posts():
+    return _fix_drift(Post.objects.all(), {
+        'comments_count': _count(Comment, 'post'),
+    })
@@ -1,6 +1,7 @@
 from django.forms import ModelForm
 
 from .models import Post, Comment
+from .uploads import BoundedImageField
 
 
 class PostForm(ModelForm):
@@ -9,6 +10,7 @@ class PostForm(ModelForm):
         labels = {'group': 'Группа', 'text': 'Сообщение'}
         help_texts = {'group': 'Выберите группу', 'text': 'Введите ссообщение'}
         fields = ['group', 'text', 'image']
+        field_classes = {'image': BoundedImageField}
 
 
 class CommentForm(ModelForm):
@@ -0,0 +1,23 @@
+"""Контекст фрагментов страниц, зависящих от пользователя.
+
+Фрагменты подставляются в закэшированную общую страницу на каждый
+запрос (см. core.holes), поэтому получают только запрос и аргументы
+из метки.
+"""
+from core.holes import provider
+
+from .forms import CommentForm
+from .models import Follow
+
+
+@provider('posts/includes/follow_button.html')
+def follow_button(request, author):
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author__username=author
+    ).exists()
+    return {'following': following}
+
+
+@provider('posts/includes/comment_form.html')
+def comment_form(request, post_id):
+    return {'form': CommentForm()}
@@ -0,0 +1,100 @@
+import copy
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+
+from core import cache
+
+from .models import Group, Post
+
+GENERATION_KEY = 'groups:generation'
+FIELDS = [field.attname for field in Group._meta.concrete_fields]
+
+_state = {'generation': None, 'checked': float('-inf'), 'by_id': {},
+          'by_slug': {}}
+
+
+def _generation():
+    generation = shared_cache.get(GENERATION_KEY)
+    if generation is None:
+        shared_cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = shared_cache.get(GENERATION_KEY)
+    return generation
+
+
+def _load():
+    return [
+        [row[name] for name in FIELDS]
+        for row in Group.objects.values(*FIELDS)
+    ]
+
+
+def _groups():
+    """Словари групп текущего процесса.
+
+    Весь справочник групп лежит в общем кэше под ключом поколения;
+    сверять поколение процесс ходит не чаще раза в GROUP_CACHE_LOCAL_TTL
+    секунд, так что в устойчивом состоянии поиск группы не делает
+    ни запросов к БД, ни обращений к кэшу.
+    """
+    global _state
+    state = _state
+    now = time.monotonic()
+    if now - state['checked'] < settings.GROUP_CACHE_LOCAL_TTL:
+        return state
+    generation = _generation()
+    if generation != state['generation']:
+        rows = cache.get_or_set(
+            f'groups:{generation}', _load, settings.GROUP_CACHE_TIMEOUT
+        )
+        groups = [Group.from_db('default', FIELDS, row) for row in rows]
+        state = {
+            'generation': generation,
+            'by_id': {group.pk: group for group in groups},
+            'by_slug': {group.slug: group for group in groups},
+        }
+    # Словарь заменяется целиком, поэтому потокам не нужна блокировка.
+    _state = {**state, 'checked': now}
+    return _state
+
+
+def invalidate():
+    """Новое поколение справочника для всех процессов."""
+    global _state
+    shared_cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
+    _state = {**_state, 'checked': float('-inf')}
+
+
+def warm_up():
+    _groups()
+
+
+def get_by_slug(slug):
+    """Группа по slug или None.
+
+    Группы, которых процесс ещё не видел, ищутся в БД: новая группа могла
+    появиться в другом процессе в пределах GROUP_CACHE_LOCAL_TTL.
+    """
+    group = _groups()['by_slug'].get(slug)
+    if group is None:
+        return Group.objects.filter(slug=slug).first()
+    return copy.copy(group)
+
+
+def get_by_id(group_id):
+    group = _groups()['by_id'].get(group_id)
+    if group is None:
+        return Group.objects.filter(pk=group_id).first()
+    return copy.copy(group)
+
+
+def attach(posts):
+    """Подставляет постам группы из кэша вместо JOIN или запроса."""
+    by_id = _groups()['by_id']
+    field = Post._meta.get_field('group')
+    for post in posts:
+        if post.group_id in by_id and not field.is_cached(post):
+            field.set_cached_value(post, copy.copy(by_id[post.group_id]))
+    return posts
@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает группы, посты, комментарии или подписки '
+        'в NDJSON или CSV.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(bulk.MODELS))
+        parser.add_argument('--format', choices=bulk.FORMATS,
+                            default='ndjson')
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для выгрузки, по умолчанию stdout.',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: выгрузка продолжится после '
+                 'последнего записанного pk и допишет --output.',
+        )
+
+    def handle(self, *args, **options):
+        model = bulk.MODELS[options['model']]
+        after_pk = bulk.read_checkpoint(options['checkpoint'])
+        if options['output'] == '-':
+            stream = sys.stdout
+        else:
+            stream = open(options['output'], 'a' if after_pk else 'w',
+                          encoding='utf-8', newline='')
+        try:
+            total = bulk.export_rows(
+                model, stream, options['format'], options['batch_size'],
+                after_pk=after_pk, checkpoint=options['checkpoint'],
+                progress=self.progress,
+            )
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        self.stderr.write(self.style.SUCCESS(f'Выгружено строк: {total}'))
+
+    def progress(self, total, done, elapsed):
+        rate = done / elapsed if elapsed else 0
+        self.stderr.write(f'{total} строк, {rate:.0f} строк/с')
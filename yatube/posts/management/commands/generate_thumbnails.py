@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+from django.db.models import Q
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _generate(item):
+    post_id, source = item
+    try:
+        return thumbnails.generate(post_id, source) is not None
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит недостающие миниатюры и адаптивные варианты картинок '
+        'постов в несколько потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число потоков, по умолчанию 4.',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перестроить и уже готовые миниатюры.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['force']:
+            posts = posts.filter(Q(thumbnail='') | Q(variants=''))
+        items = list(posts.values_list('pk', 'image'))
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            total = sum(pool.map(_generate, items))
+        self.stdout.write(self.style.SUCCESS(f'Построено миниатюр: {total}'))
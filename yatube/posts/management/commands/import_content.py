@@ -0,0 +1,52 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает группы, посты, комментарии или подписки '
+        'из NDJSON или CSV пачками bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(bulk.MODELS))
+        parser.add_argument(
+            'input', help='Файл выгрузки или - для stdin.',
+        )
+        parser.add_argument('--format', choices=bulk.FORMATS,
+                            default='ndjson')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: повторный запуск пропустит уже '
+                 'загруженные строки.',
+        )
+
+    def handle(self, *args, **options):
+        model = bulk.MODELS[options['model']]
+        skip = bulk.read_checkpoint(options['checkpoint'])
+        if options['input'] == '-':
+            stream = sys.stdin
+        else:
+            stream = open(options['input'], encoding='utf-8', newline='')
+        try:
+            total = bulk.import_rows(
+                model, bulk.read_rows(options['format'], stream),
+                options['batch_size'], skip=skip,
+                checkpoint=options['checkpoint'], progress=self.progress,
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {total - skip}. Сигналы не вызывались: '
+            'запустите reconcile_counters, rebuild_timeline и '
+            'rebuild_search_index.'
+        ))
+
+    def progress(self, total, done, elapsed):
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(f'{total} строк, {rate:.0f} строк/с')
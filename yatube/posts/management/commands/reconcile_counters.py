@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и авторов.'
+
+    def handle(self, *args, **options):
+        authors = counters.reconcile_authors()
+        posts = counters.reconcile_posts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: авторов {authors}, постов {posts}'
+        ))
@@ -0,0 +1,65 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timelines(apps, schema_editor):
+    """Раскладывает посты по лентам существующих подписок.
+
+    Как posts.timeline.backfill: только авторы не выше
+    TIMELINE_FANOUT_LIMIT, последние TIMELINE_BACKFILL_LIMIT постов.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    authors = Follow.objects.order_by().values('author').annotate(
+        total=models.Count('id')
+    ).filter(
+        total__lte=settings.TIMELINE_FANOUT_LIMIT
+    ).values_list('author', flat=True)
+    limit = settings.TIMELINE_BACKFILL_LIMIT
+    for author in authors.iterator():
+        posts = Post.objects.filter(author=author).order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True)
+        if limit is not None:
+            posts = posts[:limit]
+        posts = list(posts)
+        followers = Follow.objects.filter(
+            author=author
+        ).values_list('user_id', flat=True)
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(user_id=user_id, post_id=post_id)
+                for user_id in followers.iterator()
+                for post_id in posts
+            ),
+            batch_size=settings.TIMELINE_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0008_follow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:00
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def seed_versions(apps, schema_editor):
+    ResourceVersion = apps.get_model('posts', 'ResourceVersion')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    now = timezone.now()
+    keys = ['index']
+    keys += [f'group:{slug}' for slug in Group.objects.values_list(
+        'slug', flat=True
+    )]
+    keys += [f'author:{username}' for username in Post.objects.values_list(
+        'author__username', flat=True
+    ).order_by().distinct()]
+    ResourceVersion.objects.bulk_create(
+        [ResourceVersion(key=key, updated=now) for key in keys],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('key', models.CharField(max_length=200, primary_key=True, serialize=False)),
+                ('updated', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Версия ресурса',
+                'verbose_name_plural': 'Версии ресурсов',
+            },
+        ),
+        migrations.RunPython(seed_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_popular(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    AuthorStats.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).update(fanout_on_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_timelineentry_pub_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='fanout_on_read',
+            field=models.BooleanField(default=False, verbose_name='Без раскладки по лентам'),
+        ),
+        migrations.RunPython(mark_popular, migrations.RunPython.noop),
+    ]
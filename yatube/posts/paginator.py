@@ -0,0 +1,274 @@
+import base64
+import heapq
+import json
+from collections import namedtuple
+from itertools import groupby, islice
+from operator import attrgetter
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Ссылка окна пагинации; query — строка запроса без «?».
+PageLink = namedtuple('PageLink', 'number query current ellipsis')
+ELLIPSIS = PageLink(None, '', False, True)
+
+
+class CursorPage(Page):
+    """Страница keyset-пагинации: знает соседей без COUNT(*)."""
+
+    def __init__(self, object_list, number, paginator,
+                 has_next=False, has_previous=False):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<CursorPage %s>' % self.number
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return self.paginator.per_page * (self.number - 1) + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor(
+            self.object_list[-1], self.number + 1, forward=True
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode_cursor(
+            self.object_list[0], self.number - 1, forward=False
+        )
+
+    @cached_property
+    def window(self):
+        """Первая страница, текущая ±paginator.window и многоточия.
+
+        Размер окна не зависит от длины ленты. Соседние страницы
+        адресуются курсорами, их ключи читаются одним лёгким запросом в
+        каждую сторону. Номер последней страницы потребовал бы COUNT(*),
+        поэтому окно заканчивается многоточием.
+        """
+        size = self.paginator.window
+        links = []
+        if self.number > 1:
+            links.append(PageLink(1, 'page=1', False, False))
+            behind, _ = self._neighbour_links(
+                min(size, self.number - 2), forward=False
+            )
+            if self.number - len(behind) > 2:
+                links.append(ELLIPSIS)
+            links.extend(reversed(behind))
+        links.append(PageLink(self.number, '', True, False))
+        if self._has_next:
+            ahead, more = self._neighbour_links(size, forward=True)
+            links.extend(ahead)
+            if more:
+                links.append(ELLIPSIS)
+        return links
+
+    def _neighbour_links(self, count, forward):
+        """До count ссылок в сторону forward и есть ли страницы дальше."""
+        if not count or not self.object_list:
+            return [], False
+        paginator = self.paginator
+        per_page = paginator.per_page
+        edge = self.object_list[-1 if forward else 0]
+        rows = paginator.neighbours(edge, forward, count * per_page + 1)
+        step = 1 if forward else -1
+        links = []
+        for distance in range(1, count + 1):
+            if len(rows) <= (distance - 1) * per_page:
+                break
+            number = self.number + step * distance
+            if distance == 1:
+                cursor = paginator.encode_cursor(edge, number, forward)
+            else:
+                cursor = paginator.encode_values(
+                    rows[(distance - 1) * per_page - 1], number, forward
+                )
+            links.append(PageLink(number, f'cursor={cursor}', False, False))
+        return links, len(rows) > count * per_page
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (pub_date, id).
+
+    Следующая страница выбирается условием по ключу последней записи
+    вместо OFFSET, поэтому время выборки не зависит от глубины страницы.
+    count, num_pages и page_range унаследованы и по-прежнему делают
+    COUNT(*), шаблоны ленты их не используют. ?page=N листается через
+    OFFSET, поэтому номер страницы ограничен max_page.
+
+    sources(object_list) — выборки, из которых на самом деле читается
+    лента: пары (queryset, поля ключа). Поля ключа у выборки свои, но
+    их значения совпадают с keys записи. Каждая страница читается
+    отдельным ограниченным запросом к каждой выборке, результаты
+    сливаются по ключу; запись из нескольких выборок берётся один раз.
+    """
+
+    cursor_param = 'cursor'
+    page_param = 'page'
+    max_page = 100
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id'),
+                 descending=True, window=2, sources=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.keys = keys
+        self.descending = descending
+        self.window = window
+        self._sources = sources
+
+    @cached_property
+    def sources(self):
+        if self._sources is None:
+            return [(self.object_list, self.keys)]
+        return self._sources(self.object_list)
+
+    def _ordering(self, forward, keys):
+        desc = self.descending == forward
+        return [f'-{key}' if desc else key for key in keys]
+
+    def _after(self, values, forward, keys):
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for i, key in enumerate(keys):
+            term = Q(**{f'{key}__{lookup}': values[i]})
+            for prev_key, prev_value in zip(keys[:i], values[:i]):
+                term &= Q(**{prev_key: prev_value})
+            condition |= term
+        return condition
+
+    def _rows(self, values, forward, limit, offset=0, flat=False):
+        """До limit записей за ключом values (None — с начала ленты).
+
+        flat — только кортежи ключей вместо записей.
+        """
+        parts = []
+        for queryset, keys in self.sources:
+            if values is not None:
+                queryset = queryset.filter(self._after(values, forward, keys))
+            queryset = queryset.order_by(*self._ordering(forward, keys))
+            if flat:
+                queryset = queryset.values_list(*keys)
+            parts.append(queryset[:offset + limit])
+        if len(parts) == 1:
+            return list(parts[0][offset:])
+        key = None if flat else attrgetter(*self.keys)
+        merged = heapq.merge(
+            *parts, key=key, reverse=self.descending == forward
+        )
+        unique = (next(group) for _, group in groupby(merged, key))
+        return list(islice(unique, offset, offset + limit))
+
+    def encode_cursor(self, obj, number, forward=True):
+        return self.encode_values(
+            [getattr(obj, key) for key in self.keys], number, forward
+        )
+
+    def encode_values(self, values, number, forward=True):
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in values
+        ]
+        payload = json.dumps(
+            {'k': values, 'n': number, 'f': forward},
+            separators=(',', ':'),
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded))
+            model = self.object_list.model
+            values = [
+                model._meta.get_field(key).to_python(value)
+                for key, value in zip(self.keys, payload['k'])
+            ]
+            if len(values) != len(self.keys):
+                return None
+            return values, max(int(payload['n']), 1), bool(payload['f'])
+        except (ValueError, TypeError, KeyError, AttributeError,
+                OverflowError, ValidationError):
+            return None
+
+    def neighbours(self, obj, forward, limit):
+        """Ключи до limit записей за obj в заданную сторону."""
+        values = [getattr(obj, key) for key in self.keys]
+        return self._rows(values, forward, limit, flat=True)
+
+    def _first_page(self):
+        return self._offset_page(1)
+
+    def _offset_page(self, number):
+        offset = (number - 1) * self.per_page
+        rows = self._rows(None, True, self.per_page + 1, offset)
+        if not rows and number > 1:
+            return self._first_page()
+        return CursorPage(
+            rows[:self.per_page], number, self,
+            has_next=len(rows) > self.per_page,
+            has_previous=number > 1,
+        )
+
+    def cursor_page(self, cursor):
+        decoded = self.decode_cursor(cursor)
+        if decoded is None:
+            return self._first_page()
+        values, number, forward = decoded
+        rows = self._rows(values, forward, self.per_page + 1)
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows:
+            return self._first_page()
+        if forward:
+            return CursorPage(rows, number, self,
+                              has_next=more, has_previous=number > 1)
+        rows.reverse()
+        if not more:
+            number = 1
+        return CursorPage(rows, number, self,
+                          has_next=True, has_previous=more)
+
+    def get_page(self, number):
+        try:
+            number = self.validate_number(number)
+        except (TypeError, ValueError):
+            number = 1
+        return self._offset_page(number)
+
+    def validate_number(self, number):
+        number = int(number)
+        if number < 1:
+            raise ValueError(number)
+        return min(number, self.max_page)
+
+    def from_request(self, request):
+        cursor = request.GET.get(self.cursor_param)
+        if cursor:
+            return self.cursor_page(cursor)
+        return self.get_page(request.GET.get(self.page_param))
@@ -0,0 +1,229 @@
+import base64
+import json
+import math
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+MARK_START, MARK_END = '\x02', '\x03'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def highlight(snippet):
+    """Экранирует фрагмент и превращает маркеры совпадений в <mark>."""
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def encode_cursor(values):
+    payload = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Курсор или None, если он испорчен.
+
+    Счёт должен быть конечным, а id — помещаться в 64-битное целое
+    SQLite: иначе запрос упал бы при подстановке параметров.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, post_id, bound, truncated = json.loads(
+            base64.urlsafe_b64decode(padded)
+        )
+        score, post_id, bound = float(score), int(post_id), int(bound)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    if not math.isfinite(score):
+        return None
+    if post_id.bit_length() > 63 or bound.bit_length() > 63:
+        return None
+    return score, post_id, bound, bool(truncated)
+
+
+class SearchResults:
+    """Страница результатов: посты в порядке релевантности и курсор.
+
+    truncated — совпадений больше, чем бэкенд ранжирует, и старые из
+    них в выдачу не попадут.
+    """
+
+    def __init__(self, posts, next_cursor=None, truncated=False):
+        self.object_list = posts
+        self.next_cursor = next_cursor
+        self.truncated = truncated
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class BaseSearchBackend:
+    def index(self, post):
+        raise NotImplementedError
+
+    def remove(self, post_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, query, cursor=None, limit=10):
+        raise NotImplementedError
+
+    def _fetch_posts(self, hits):
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [post_id for post_id, _, _ in hits]
+        )
+        result = []
+        for post_id, _, snippet in hits:
+            post = posts.get(post_id)
+            if post is not None:
+                post.snippet = snippet
+                result.append(post)
+        return result
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Инвертированный индекс FTS5 с ранжированием bm25.
+
+    Таблица создаётся миграцией; строка индекса имеет rowid поста.
+    """
+
+    def match_expression(self, query):
+        # Только точные термы: префиксный запрос заставляет FTS5 собрать
+        # в памяти doclist всех подходящих слов, даже при поиске по rowid.
+        tokens = TOKEN_RE.findall(query.lower())
+        return ' '.join(f'"{token}"' for token in tokens)
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                'SELECT id, text FROM posts_post'
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+            )
+
+    def _execute(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _lower_bound(self, expression):
+        """rowid, ниже которого совпадения не ранжируются, и есть ли такие.
+
+        Для частых слов bm25 пришлось бы считать по всем постам, поэтому
+        ранжируются только POST_SEARCH_MAX_CANDIDATES самых новых
+        совпадений; обход doclist по убыванию rowid дешёвый.
+        """
+        rows = self._execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            'ORDER BY rowid DESC LIMIT 2 OFFSET %s',
+            [expression, settings.POST_SEARCH_MAX_CANDIDATES - 1],
+        )
+        if not rows:
+            return 0, False
+        return rows[0][0], len(rows) > 1
+
+    def search(self, query, cursor=None, limit=10):
+        expression = self.match_expression(query)
+        if not expression:
+            return SearchResults([])
+        after = decode_cursor(cursor) if cursor else None
+        if after is None:
+            bound, truncated = self._lower_bound(expression)
+        else:
+            bound, truncated = after[2:]
+        # Фрагмент считается в том же MATCH, что и ранг.
+        sql = (
+            f'SELECT rowid, bm25({FTS_TABLE}) AS score, '
+            f'snippet({FTS_TABLE}, 0, %s, %s, %s, %s) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid >= %s'
+        )
+        params = [MARK_START, MARK_END, '…',
+                  settings.POST_SEARCH_SNIPPET_TOKENS, expression, bound]
+        if after is not None:
+            sql += ' AND (score > %s OR (score = %s AND rowid > %s))'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY score, rowid LIMIT %s'
+        params.append(limit + 1)
+        rows = self._execute(sql, params)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(
+                [rows[-1][1], rows[-1][0], bound, truncated]
+            )
+        hits = [(post_id, score, highlight(snippet))
+                for post_id, score, snippet in rows]
+        return SearchResults(self._fetch_posts(hits), next_cursor, truncated)
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Запасной вариант без индекса для СУБД без FTS5: LIKE по тексту."""
+
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, cursor=None, limit=10):
+        tokens = TOKEN_RE.findall(query)
+        if not tokens:
+            return SearchResults([])
+        posts = Post.objects.select_related('author', 'group')
+        for token in tokens:
+            posts = posts.filter(text__icontains=token)
+        after = decode_cursor(cursor) if cursor else None
+        if after is not None:
+            posts = posts.filter(pk__lt=after[1])
+        rows = list(posts.order_by('-pk')[:limit + 1])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([0, rows[-1].pk, 0, False])
+        for post in rows:
+            post.snippet = escape(post.text[:200])
+        return SearchResults(rows, next_cursor)
+
+
+def get_backend():
+    return import_string(settings.POST_SEARCH_BACKEND)()
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from sorl import thumbnail
+
+from . import counters, groups, search, thumbnails, timeline, versions
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_author(instance.author_id, posts_count=1)
+        timeline.fan_out_post(instance)
+    if instance.image and not instance.thumbnail:
+        thumbnails.schedule(instance)
+    search.get_backend().index(instance)
+    versions.touch(*versions.post_keys(
+        instance, getattr(instance, '_previous_group_slug', None)
+    ))
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    if not instance.pk:
+        return
+    old_image, instance._previous_group_slug, old_variants = (
+        Post.objects.filter(pk=instance.pk).values_list(
+            'image', 'group__slug', 'variants'
+        ).first() or ('', None, '')
+    )
+    if old_image != instance.image.name:
+        instance.thumbnail = ''
+        instance.variants = ''
+        thumbnails.discard_variants(old_variants)
+        if old_image:
+            thumbnail.delete(old_image, delete_file=False)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, posts_count=-1)
+    search.get_backend().remove(instance.pk)
+    versions.touch(*versions.post_keys(instance))
+    thumbnails.discard_variants(instance.variants)
+    if instance.image:
+        thumbnail.delete(instance.image, delete_file=False)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # Карточки постов показывают группу: сдвигаем их версию.
+    Post.objects.filter(group=instance).update(updated=timezone.now())
+    versions.touch('index', f'group:{instance.slug}', versions.GROUPS_KEY)
+    # Сразу — для этого процесса, после коммита — чтобы никто не успел
+    # закэшировать незакоммиченное состояние под новым поколением.
+    groups.invalidate()
+    transaction.on_commit(groups.invalidate)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+    versions.touch(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    versions.touch(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_author(instance.author_id, followers_count=1)
+        counters.bump_author(instance.user_id, following_count=1)
+        timeline.follower_gained(instance.author_id)
+        timeline.backfill(instance.user, instance.author)
+    versions.touch(f'author:{instance.author.username}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, followers_count=-1)
+    counters.bump_author(instance.user_id, following_count=-1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+    timeline.follower_lost(instance.author_id)
+    versions.touch(f'author:{instance.author.username}')
@@ -0,0 +1,14 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.streaming import current
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    stream = current(context)
+    defer = stream.defer if stream is not None else None
+    return [mark_safe(card) for card in render_cards(posts, defer)]
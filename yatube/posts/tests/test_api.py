@@ -0,0 +1,157 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import groups
+from posts.api import POST_FIELDS
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class APITest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        groups.invalidate()
+        self.posts = [
+            Post.objects.create(
+                author=self.author, group=self.group if i % 2 else None,
+                text=f'Пост {i}',
+            )
+            for i in range(POSTS_PER_PAGE + 3)
+        ]
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_walk_by_cursor(self):
+        urls = (
+            reverse('api:post_list'),
+            reverse('api:profile_posts', args=[self.author.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                seen = [post['id'] for post in data['results']]
+                data = self.client.get(data['next']).json()
+                seen += [post['id'] for post in data['results']]
+                self.assertIsNone(data['next'])
+                self.assertEqual(
+                    seen, [post.pk for post in reversed(self.posts)]
+                )
+
+    def test_post_payload(self):
+        data = self.client.get(
+            reverse('api:post_detail', args=[self.posts[1].pk])
+        ).json()
+        self.assertEqual(data['author'], 'author')
+        self.assertEqual(data['group'], 'group')
+        self.assertEqual(data['text'], 'Пост 1')
+        self.assertEqual(data['comments_count'], 0)
+        self.assertIsNone(data['image'])
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get(
+            reverse('api:group_posts', args=[self.group.slug]),
+            {'fields': 'id,text'},
+        )
+        for post in response.json()['results']:
+            self.assertEqual(set(post), {'id', 'text'})
+        response = self.client.get(
+            reverse('api:post_list'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_sparse_fields_skip_joins(self):
+        with self.assertNumQueries(2):
+            self.client.get(reverse('api:post_list'), {'fields': 'id'})
+
+    def test_each_sparse_field_within_budget(self):
+        Post.objects.update(image='posts/a.jpg', thumbnail='posts/a_t.jpg')
+        url = reverse('api:post_detail', args=[self.posts[0].pk])
+        self.client.get(reverse('api:post_list'))
+        self.client.get(url)
+        for name in POST_FIELDS:
+            with self.subTest(field=name):
+                if name != 'comments_count':
+                    with self.assertNumQueries(2):
+                        self.client.get(
+                            reverse('api:post_list'), {'fields': name}
+                        )
+                # Ключи версий поста, версия и сам пост.
+                with self.assertNumQueries(3):
+                    self.client.get(url, {'fields': name})
+
+    def test_batch_lookup(self):
+        ids = [self.posts[2].pk, 999, self.posts[0].pk]
+        with self.assertNumQueries(2):
+            data = self.client.get(
+                reverse('api:post_list'),
+                {'ids': ','.join(map(str, ids))},
+            ).json()
+        self.assertEqual(
+            [post['id'] for post in data['results']], [ids[0], ids[2]]
+        )
+        self.assertEqual(data['missing'], [999])
+        for ids in ('x', '0', '-1', '99999999999999999999999'):
+            with self.subTest(ids=ids):
+                response = self.client.get(
+                    reverse('api:post_list'), {'ids': ids}
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_etag_revalidation(self):
+        url = reverse('api:post_detail', args=[self.posts[0].pk])
+        response = self.client.get(url)
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Комментарий'
+        )
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.json()['comments_count'], 1)
+
+    def test_comments(self):
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Комментарий'
+        )
+        data = self.client.get(
+            reverse('api:post_comments', args=[self.posts[0].pk])
+        ).json()
+        self.assertEqual(data['results'][0]['author'], 'reader')
+        self.assertIsNone(data['next'])
+
+    def test_follow_and_unfollow(self):
+        url = reverse('api:follow', args=[self.author.username])
+        self.assertEqual(self.client.post(url).status_code, 401)
+        self.assertEqual(self.reader_client.post(url).status_code, 201)
+        self.assertEqual(self.reader_client.post(url).status_code, 200)
+        feed = self.reader_client.get(reverse('api:follow_posts')).json()
+        self.assertEqual(len(feed['results']), POSTS_PER_PAGE)
+        self.reader_client.delete(url)
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(
+            self.reader_client.post(
+                reverse('api:follow', args=[self.reader.username])
+            ).status_code,
+            400,
+        )
+
+    def test_not_found_is_json(self):
+        response = self.client.get(reverse('api:post_detail', args=[999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Не найдено'})
+
+    def test_payload_smaller_than_page(self):
+        html = self.client.get(reverse('posts:index'))
+        api = self.client.get(reverse('api:post_list'))
+        self.assertLess(len(api.content) * 2, len(html.content))
@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+OLD_DATE = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+class BulkContentTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for i in range(5):
+            Post.objects.create(
+                author=self.author, group=self.group if i % 2 else None,
+                text=f'Пост {i}, "с кавычками"\nи переносом',
+            )
+        Post.objects.update(pub_date=OLD_DATE)
+        Comment.objects.create(
+            post=Post.objects.first(), author=self.reader, text='Да'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def call(self, name, *args, **options):
+        call_command(name, *args, stdout=StringIO(), stderr=StringIO(),
+                     **options)
+
+    def snapshot(self, model):
+        return list(model.objects.order_by('pk').values())
+
+    def round_trip(self, fmt):
+        models = (('group', Group), ('post', Post), ('comment', Comment),
+                  ('follow', Follow))
+        before = {name: self.snapshot(model) for name, model in models}
+        for name, _ in models:
+            self.call('export_content', name, format=fmt,
+                      output=self.path(f'{name}.{fmt}'), batch_size=2)
+        for name, model in reversed(models):
+            model.objects.all().delete()
+        for name, model in models:
+            self.call('import_content', name, self.path(f'{name}.{fmt}'),
+                      format=fmt, batch_size=2)
+            with self.subTest(model=name, format=fmt):
+                self.assertEqual(self.snapshot(model), before[name])
+
+    def test_ndjson_round_trip(self):
+        self.round_trip('ndjson')
+
+    def test_csv_round_trip(self):
+        """CSV сохраняет NULL, кавычки, переносы строк и даты."""
+        self.round_trip('csv')
+
+    def test_import_resumes_from_checkpoint(self):
+        self.call('export_content', 'post', output=self.path('posts.ndjson'))
+        Post.objects.all().delete()
+        checkpoint = self.path('import.checkpoint')
+        with open(checkpoint, 'w') as file:
+            file.write('3')
+        self.call('import_content', 'post', self.path('posts.ndjson'),
+                  checkpoint=checkpoint, batch_size=1)
+        self.assertEqual(Post.objects.count(), 2)
+        with open(checkpoint) as file:
+            self.assertEqual(file.read(), '5')
+
+    def test_export_resumes_after_last_pk(self):
+        checkpoint = self.path('export.checkpoint')
+        output = self.path('posts.csv')
+        pks = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+        with open(checkpoint, 'w') as file:
+            file.write(str(pks[2]))
+        with open(output, 'w') as file:
+            file.write('уже выгружено\n')
+        self.call('export_content', 'post', format='csv', output=output,
+                  checkpoint=checkpoint)
+        with open(output) as file:
+            self.assertEqual(file.readline(), 'уже выгружено\n')
+        with open(checkpoint) as file:
+            self.assertEqual(file.read(), str(pks[-1]))
+
+    def test_import_changes_etags(self):
+        """Загрузка без сигналов всё равно меняет версии страниц."""
+        post = Comment.objects.get().post
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        )
+        models = ('group', 'post', 'comment', 'follow')
+        for name in models:
+            self.call('export_content', name,
+                      output=self.path(f'{name}.ndjson'))
+        client = Client()
+        for name in models:
+            responses = [client.get(url) for url in urls]
+            self.call('import_content', name, self.path(f'{name}.ndjson'))
+            for url, response in zip(urls, responses):
+                if name == 'comment' and url != urls[3]:
+                    continue
+                if name == 'follow' and url != urls[2]:
+                    continue
+                with self.subTest(model=name, url=url):
+                    again = client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                    self.assertEqual(again.status_code, 200)
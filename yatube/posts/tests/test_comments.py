@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.utils import COMMENTS_PER_PAGE
+
+User = get_user_model()
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.author, text=f'Комментарий {i}')
+            for i in range(COMMENTS_PER_PAGE * 2 + 5)
+        ])
+        cls.url = reverse('posts:post_comments', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_page(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertContains(response, comments.next_cursor)
+
+    def test_fragments_walk_all_comments(self):
+        page = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        ).context['comments']
+        seen = [comment.pk for comment in page]
+        while page.has_next():
+            response = self.client.get(self.url, {'cursor': page.next_cursor})
+            self.assertTemplateUsed(
+                response, 'posts/includes/comment_list.html'
+            )
+            self.assertNotContains(response, '<html')
+            page = response.context['comments']
+            seen += [comment.pk for comment in page]
+        self.assertEqual(
+            seen, list(Comment.objects.order_by('pub_date', 'id')
+                       .values_list('pk', flat=True))
+        )
+
+    def test_json_batches(self):
+        data = self.client.get(self.url, {'format': 'json'}).json()
+        self.assertEqual(len(data['comments']), COMMENTS_PER_PAGE)
+        self.assertEqual(data['comments'][0]['author'], 'author')
+        data = self.client.get(data['next']).json()
+        data = self.client.get(data['next']).json()
+        self.assertEqual(len(data['comments']), 5)
+        self.assertIsNone(data['next'])
+
+    def test_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk + 1])
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        self.guest = Client()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def revalidate(self, url, response, client=None):
+        client = client or self.guest
+        return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_not_modified_without_building_page(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                # Только чтение версии (и автора поста для post_detail).
+                with self.assertNumQueries(2 if 'posts/' in url else 1):
+                    again = self.revalidate(url, response)
+                self.assertEqual(again.status_code, 304)
+
+    def test_if_modified_since(self):
+        url = self.urls[0]
+        response = self.guest.get(url)
+        again = self.guest.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(again.status_code, 304)
+
+    def test_new_post_changes_feeds(self):
+        responses = [self.guest.get(url) for url in self.urls[:3]]
+        Post.objects.create(author=self.author, group=self.group, text='Ещё')
+        for url, response in zip(self.urls, responses):
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, response).status_code,
+                                 200)
+
+    def test_comment_changes_post_detail_only(self):
+        index, detail = self.urls[0], self.urls[3]
+        responses = [self.guest.get(index), self.guest.get(detail)]
+        Comment.objects.create(post=self.post, author=self.reader, text='Да')
+        self.assertEqual(self.revalidate(index, responses[0]).status_code, 304)
+        self.assertEqual(self.revalidate(detail, responses[1]).status_code,
+                         200)
+
+    def test_follow_and_group_rename(self):
+        profile = self.urls[2]
+        response = self.guest.get(profile)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.revalidate(profile, response)
+        self.assertEqual(response.status_code, 200)
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertEqual(self.revalidate(profile, response).status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        url = self.urls[0]
+        response = self.guest.get(url)
+        client = Client()
+        client.force_login(self.reader)
+        self.assertEqual(
+            self.revalidate(url, response, client).status_code, 200
+        )
+
+    def test_etag_changes_with_csrf_token(self):
+        """После повторного входа форма не отдаётся из кэша браузера."""
+        url = self.urls[3]
+        client = Client()
+        client.force_login(self.reader)
+        client.get(url)
+        response = client.get(url)
+        self.assertEqual(self.revalidate(url, response, client).status_code,
+                         304)
+        client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        again = self.revalidate(url, response, client)
+        self.assertEqual(again.status_code, 200)
+        self.assertNotEqual(again['ETag'], response['ETag'])
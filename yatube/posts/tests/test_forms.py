@@ -1,17 +1,33 @@
+import os
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase, override_settings
+from django.db import OperationalError
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
+from PIL import Image
 
+from posts import thumbnails
 from posts.models import Post, Group, Comment
 
 User = get_user_model()
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x00\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -94,17 +110,9 @@ class PostCreateFormTests(TestCase):
 
     def test_post_image(self):
         post_count = Post.objects.count()
-        small_gif = (
-            b'\x47\x49\x46\x38\x39\x61\x02\x00'
-            b'\x01\x00\x00\x00\x00\x00\x00\x00'
-            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
-            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
-            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
-            b'\x0A\x00\x3B'
-        )
         uploaded = SimpleUploadedFile(
             name='small.gif',
-            content=small_gif,
+            content=SMALL_GIF,
             content_type='image/gif'
         )
         form_data = {
@@ -127,6 +135,148 @@ class PostCreateFormTests(TestCase):
             ).exists()
         )
 
+    @override_settings(POST_THUMBNAIL_SYNC=True)
+    def test_post_image_thumbnail_precomputed(self):
+        """Миниатюра строится при загрузке, а лента лишь читает её путь."""
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=SMALL_GIF,
+            content_type='image/gif'
+        )
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'С миниатюрой', 'image': uploaded},
+        )
+        post = Post.objects.get(text='С миниатюрой')
+        self.assertTrue(post.thumbnail)
+        self.assertIn(
+            'image/webp', [source['type'] for source in post.image_sources]
+        )
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, post.thumbnail_url)
+        self.assertContains(response, '<source type="image/webp"')
+
+    @override_settings(POST_THUMBNAIL_SYNC=True)
+    def test_post_edit_image_resets_variants(self):
+        """Замена и удаление картинки при правке сбрасывают варианты."""
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'С вариантами',
+                'image': SimpleUploadedFile('old.gif', SMALL_GIF, 'image/gif'),
+            },
+        )
+        post = Post.objects.get(text='С вариантами')
+        old_variants = post.variants
+        self.assertTrue(old_variants)
+        url = reverse('posts:post_edit', args=(post.id,))
+        self.author_client.post(url, data={
+            'text': 'С вариантами',
+            'image': SimpleUploadedFile('new.gif', SMALL_GIF, 'image/gif'),
+        })
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, 'posts/new.gif')
+        self.assertTrue(post.variants)
+        self.assertNotEqual(post.variants, old_variants)
+        self.author_client.post(
+            url, data={'text': 'С вариантами', 'image-clear': 'on'}
+        )
+        post.refresh_from_db()
+        self.assertFalse(post.image)
+        self.assertEqual(post.variants, '')
+        self.assertEqual(post.thumbnail, '')
+
+    def create_with_locks(self, name, locks):
+        """Создаёт пост, первые locks попыток записи падают после INSERT."""
+        save = Post.save
+        attempts = []
+
+        def locked_save(post, *args, **kwargs):
+            save(post, *args, **kwargs)
+            attempts.append(post.image.name)
+            if len(attempts) <= locks:
+                raise OperationalError('database is locked')
+
+        with mock.patch.object(Post, 'save', locked_save):
+            self.author_client.post(reverse('posts:post_create'), data={
+                'text': name,
+                'image': SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+            })
+        return attempts
+
+    def stored(self, name):
+        directory = os.path.join(TEMP_MEDIA_ROOT, 'posts')
+        stem = os.path.splitext(name)[0]
+        return [file for file in os.listdir(directory)
+                if file.startswith(stem)]
+
+    @override_settings(SQLITE_RETRY_ATTEMPTS=3, SQLITE_RETRY_DELAY=0)
+    def test_post_create_retry_stores_image_once(self):
+        """Повтор после «database is locked» не копирует картинку."""
+        attempts = self.create_with_locks('retry.gif', locks=1)
+        self.assertEqual(attempts, ['posts/retry.gif'] * 2)
+        post = Post.objects.get(text='retry.gif')
+        self.assertEqual(post.image.name, 'posts/retry.gif')
+        self.assertEqual(self.stored('retry.gif'), ['retry.gif'])
+
+    @override_settings(SQLITE_RETRY_ATTEMPTS=2, SQLITE_RETRY_DELAY=0)
+    def test_post_create_failure_removes_image(self):
+        with self.assertRaises(OperationalError):
+            self.create_with_locks('failed.gif', locks=2)
+        self.assertFalse(Post.objects.filter(text='failed.gif').exists())
+        self.assertEqual(self.stored('failed.gif'), [])
+
+    @override_settings(POST_IMAGE_MAX_BYTES=20)
+    def test_post_image_too_large(self):
+        """Слишком большой файл отклоняется, пост не создаётся."""
+        post_count = Post.objects.count()
+        uploaded = SimpleUploadedFile(
+            name='big.gif',
+            content=SMALL_GIF,
+            content_type='image/gif'
+        )
+        response = self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Большая картинка', 'image': uploaded},
+        )
+        self.assertEqual(Post.objects.count(), post_count)
+        self.assertTrue(response.context['form'].has_error('image'))
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1)
+    def test_post_image_too_many_pixels(self):
+        uploaded = SimpleUploadedFile(
+            name='wide.gif',
+            content=SMALL_GIF,
+            content_type='image/gif'
+        )
+        response = self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Широкая картинка', 'image': uploaded},
+        )
+        self.assertTrue(
+            response.context['form'].has_error('image', 'too_many_pixels')
+        )
+
+    def test_post_image_metadata_stripped(self):
+        """JPEG пересохраняется без EXIF."""
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010E] = 'секретное описание'
+        Image.new('RGB', (4, 4), 'red').save(buffer, 'JPEG', exif=exif)
+        uploaded = SimpleUploadedFile(
+            name='photo.jpg',
+            content=buffer.getvalue(),
+            content_type='image/jpeg'
+        )
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Фото', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Фото')
+        with Image.open(post.image.path) as saved:
+            self.assertEqual(saved.size, (4, 4))
+            self.assertNotIn('exif', saved.info)
+
     def test_post_comment(self):
         comment_count = Comment.objects.count()
         form_data = {
@@ -148,3 +298,38 @@ class PostCreateFormTests(TestCase):
                 author=self.user,
             ).exists()
         )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class VariantCleanupTest(TransactionTestCase):
+    """Файлы удаляются после коммита, поэтому нужны настоящие транзакции."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @override_settings(POST_THUMBNAIL_SYNC=True)
+    def test_variant_files_removed(self):
+        """Варианты старой картинки удаляются при замене и удалении поста."""
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(
+            text='С вариантами', author=author,
+            image=SimpleUploadedFile('first.gif', SMALL_GIF, 'image/gif'),
+        )
+        storage = post.image.storage
+        post.refresh_from_db()
+        first = thumbnails.variant_files(post.variants)
+        self.assertTrue(first)
+        thumbnails.generate(post.pk, post.image.name)
+        post.refresh_from_db()
+        regenerated = thumbnails.variant_files(post.variants)
+        self.assertFalse(any(map(storage.exists, first)))
+        post.image = SimpleUploadedFile('second.gif', SMALL_GIF, 'image/gif')
+        post.save()
+        post.refresh_from_db()
+        self.assertFalse(any(map(storage.exists, regenerated)))
+        second = thumbnails.variant_files(post.variants)
+        self.assertTrue(all(map(storage.exists, second)))
+        post.delete()
+        self.assertFalse(any(map(storage.exists, second)))
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts import groups
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class GroupCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        groups.invalidate()
+        groups.warm_up()
+
+    def test_lookups_are_query_free(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(groups.get_by_slug('group'), self.group)
+            self.assertEqual(groups.get_by_id(self.group.pk).title, 'Группа')
+
+    def test_returned_group_is_a_copy(self):
+        groups.get_by_slug('group').title = 'Испорчено'
+        self.assertEqual(groups.get_by_slug('group').title, 'Группа')
+
+    def test_invalidated_on_save_and_delete(self):
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertIsNone(groups.get_by_slug('group'))
+        self.assertEqual(groups.get_by_slug('renamed').pk, self.group.pk)
+        self.group.delete()
+        self.assertIsNone(groups.get_by_slug('renamed'))
+
+    def test_unknown_group_falls_back_to_database(self):
+        """Группу, созданную другим процессом, находим в БД."""
+        Group.objects.bulk_create([
+            Group(title='Новая', slug='new', description='')
+        ])
+        self.assertEqual(groups.get_by_slug('new').title, 'Новая')
+
+    def test_attach_sets_group_without_query(self):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, group=self.group, text='Пост')
+        post = Post.objects.get()
+        groups.attach([post])
+        with self.assertNumQueries(0):
+            self.assertEqual(post.group.slug, 'group')
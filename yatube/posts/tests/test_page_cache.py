@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import cache as core_cache
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class PageShellCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.guest = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_logged_in_user_served_from_shared_shell(self):
+        """Страница, закэшированная гостем, отдаётся и вошедшему."""
+        url = reverse('posts:index')
+        guest_page = self.guest.get(url)
+        self.assertContains(guest_page, 'Войти')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(url)
+        self.assertFalse(any(
+            'posts_post' in query['sql'] for query in queries
+        ))
+        self.assertContains(response, 'Пост')
+        self.assertContains(response, 'Пользователь:  reader')
+        self.assertContains(response, 'Избранные авторы')
+        self.assertNotContains(response, 'Войти')
+
+    def test_follow_button_filled_per_user(self):
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        self.assertContains(self.guest.get(url), 'Подписаться')
+        response = self.reader_client.get(url)
+        self.assertContains(response, 'Отписаться')
+        self.assertNotContains(response, '<!--hole:')
+
+    def test_post_detail_holes(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        guest_page = self.guest.get(url)
+        self.assertNotContains(guest_page, 'csrfmiddlewaretoken')
+        reader_page = self.reader_client.get(url)
+        self.assertContains(reader_page, 'csrfmiddlewaretoken')
+        self.assertNotContains(reader_page, 'редактировать запись')
+        author_page = self.author_client.get(url)
+        self.assertContains(author_page, 'редактировать запись')
+
+    def test_shell_follows_resource_version(self):
+        url = reverse('posts:index')
+        self.guest.get(url)
+        Post.objects.create(author=self.author, text='Свежий пост')
+        self.assertContains(self.reader_client.get(url), 'Свежий пост')
+
+    def test_unknown_params_bypass_shell_cache(self):
+        """Ключ — путь и параметры пагинации, прочие адреса не кэшируются."""
+        url = reverse('posts:index')
+        with mock.patch(
+            'core.holes.cache.get_or_set', wraps=core_cache.get_or_set
+        ) as get_or_set:
+            self.guest.get(url, {'x': 1})
+            self.guest.get(url + '?page=1&page=2')
+            self.assertFalse(get_or_set.called)
+            self.guest.get(url, {'cursor': 'c', 'page': 1})
+            self.guest.get(url, {'page': 1, 'cursor': 'c'})
+        first, second = (call.args[0] for call in get_or_set.call_args_list)
+        self.assertEqual(first, second)
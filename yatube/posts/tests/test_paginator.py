@@ -0,0 +1,126 @@
+import base64
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from posts.paginator import CursorPaginator
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='cursor')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}') for i in range(25)
+        )
+
+    def walk(self, paginator):
+        page = paginator.get_page(1)
+        pages = [page]
+        while page.has_next():
+            page = paginator.cursor_page(page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_cursor_walk_covers_all_posts(self):
+        """Курсоры проходят всю ленту без дублей и пропусков."""
+        pages = self.walk(CursorPaginator(Post.objects.all(), 10))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([page.number for page in pages], [1, 2, 3])
+        ids = [post.id for page in pages for post in page]
+        self.assertEqual(
+            ids, list(Post.objects.order_by('-pub_date', '-id')
+                      .values_list('id', flat=True))
+        )
+
+    def test_previous_cursor_returns_previous_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first, second, third = self.walk(paginator)
+        back = paginator.cursor_page(third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertEqual(back.number, 2)
+        back = paginator.cursor_page(back.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_no_count_query(self):
+        """Страница ленты не выполняет COUNT(*)."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('posts:index') + '?page=2')
+        self.assertEqual(len(response.context['page_obj']), 10)
+        for query in ctx.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_bad_cursor_returns_first_page(self):
+        response = self.client.get(reverse('posts:index') + '?cursor=xxx')
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_malformed_cursors_return_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        payloads = (
+            '{"k":["garbage",1],"n":2,"f":true}',
+            '{"k":["2020-01-01T00:00:00+00:00",1],"n":1e400,"f":true}',
+        )
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+                self.assertEqual(paginator.cursor_page(cursor).number, 1)
+                response = self.client.get(
+                    reverse('posts:index'), {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_huge_page_number_is_capped(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page('100000000000000000000')
+        self.assertEqual(page.number, 1)
+        response = self.client.get(
+            reverse('posts:index'), {'page': '100000000000000000000'}
+        )
+        self.assertEqual(response.status_code, 200)
+        paginator.max_page = 2
+        self.assertEqual(paginator.get_page(5).number, 2)
+
+    def labels(self, page):
+        return [
+            '…' if link.ellipsis else
+            f'[{link.number}]' if link.current else link.number
+            for link in page.window
+        ]
+
+    def test_window_is_bounded(self):
+        paginator = CursorPaginator(Post.objects.all(), 2)
+        pages = self.walk(paginator)
+        self.assertEqual(len(pages), 13)
+        self.assertEqual(self.labels(pages[0]), ['[1]', 2, 3, '…'])
+        self.assertEqual(
+            self.labels(pages[6]), [1, '…', 5, 6, '[7]', 8, 9, '…']
+        )
+        self.assertEqual(self.labels(pages[-1]), [1, '…', 11, 12, '[13]'])
+
+    def test_window_links_open_their_pages(self):
+        paginator = CursorPaginator(Post.objects.all(), 2)
+        page = self.walk(paginator)[6]
+        for link in page.window:
+            if link.ellipsis or link.current:
+                continue
+            with self.subTest(number=link.number):
+                name, value = link.query.split('=')
+                target = (paginator.get_page(value) if name == 'page'
+                          else paginator.cursor_page(value))
+                self.assertEqual(target.number, link.number)
+                self.assertEqual(
+                    list(target), list(paginator.get_page(link.number))
+                )
+
+    def test_paginator_renders_window(self):
+        response = self.client.get(reverse('posts:index'))
+        content = response.content.decode()
+        for link in response.context['page_obj'].window[1:]:
+            self.assertIn(f'href="?{link.query}"', content)
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import groups
+from posts.models import Comment, Follow, Group, Post
+from posts.tests.utils import QueryBudgetMixin
+from posts.utils import POSTS_PER_PAGE
+
+User = get_user_model()
+
+# Сессия, пользователь, подписка на странице профиля, выборка постов,
+# ключи соседних страниц для окна пагинации.
+FEED_QUERY_BUDGET = 7
+
+
+class FeedQueriesTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.author}),
+            reverse('posts:follow_index'),
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def add_posts(self, count):
+        for i in range(count):
+            Post.objects.create(
+                author=self.author, group=self.group, text=f'Пост {i}'
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        # Справочник групп загружен заранее, как в устойчивом состоянии.
+        groups.invalidate()
+        groups.warm_up()
+        with self.assertMaxQueries(FEED_QUERY_BUDGET) as context:
+            self.client.get(url)
+        return len(context.captured_queries)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """Число запросов ленты не растёт вместе с числом постов."""
+        # В обоих случаях страниц больше одной: окно пагинации на месте.
+        self.add_posts(POSTS_PER_PAGE + 2)
+        few = {url: self.count_queries(url) for url in self.urls}
+        self.add_posts(POSTS_PER_PAGE * 5)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), few[url])
+
+    def test_post_detail_comments_do_not_add_queries(self):
+        self.add_posts(1)
+        post = Post.objects.first()
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        Comment.objects.create(post=post, author=self.reader, text='Раз')
+        few = self.count_queries(url)
+        for i in range(5):
+            Comment.objects.create(post=post, author=self.author, text='Ещё')
+        self.assertEqual(self.count_queries(url), few)
@@ -0,0 +1,101 @@
+import base64
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import FTS_TABLE, get_backend
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher')
+        self.cat = Post.objects.create(
+            author=self.user, text='Кот спит на <b>подоконнике</b>'
+        )
+        self.cats = Post.objects.create(
+            author=self.user, text='Кот, ещё кот и снова кот'
+        )
+        Post.objects.create(author=self.user, text='Собака лает')
+
+    def test_search_ranks_and_highlights(self):
+        """Результаты ранжированы, совпадения выделены, HTML экранирован."""
+        response = self.client.get(reverse('posts:search'), {'q': 'кот'})
+        results = list(response.context['results'])
+        self.assertEqual(results, [self.cats, self.cat])
+        self.assertContains(response, '<mark>Кот</mark>')
+        self.assertContains(response, '&lt;b&gt;подоконнике&lt;/b&gt;')
+
+    def test_page_query_count(self):
+        """Граница кандидатов, ранжирование с фрагментами и посты."""
+        with self.assertNumQueries(3):
+            list(get_backend().search('кот'))
+
+    def test_index_follows_edits_and_deletes(self):
+        backend = get_backend()
+        self.cat.text = 'Попугай'
+        self.cat.save()
+        self.assertEqual(list(backend.search('попугай')), [self.cat])
+        self.assertEqual(list(backend.search('подоконнике')), [])
+        self.cats.delete()
+        self.assertEqual(list(backend.search('снова')), [])
+
+    def test_cursor_pagination(self):
+        backend = get_backend()
+        first = backend.search('кот', limit=1)
+        self.assertTrue(first.has_next())
+        second = backend.search('кот', cursor=first.next_cursor, limit=1)
+        self.assertFalse(second.has_next())
+        self.assertEqual(list(first) + list(second), [self.cats, self.cat])
+
+    def test_malformed_cursors_return_first_page(self):
+        """Бесконечный счёт и огромные числа в курсоре не роняют поиск."""
+        payloads = (
+            b'[1e400,1,1,false]',
+            b'[NaN,1,1,false]',
+            b'[1' + b'0' * 400 + b',1,1,false]',
+            b'[1.0,99999999999999999999999,1,false]',
+            b'[1.0,1,99999999999999999999999,false]',
+        )
+        for payload in payloads:
+            cursor = base64.urlsafe_b64encode(payload).decode().rstrip('=')
+            with self.subTest(payload=payload):
+                response = self.client.get(
+                    reverse('posts:search'), {'q': 'кот', 'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    list(response.context['results']), [self.cats, self.cat]
+                )
+
+    @override_settings(POST_SEARCH_MAX_CANDIDATES=2)
+    def test_truncation_reported(self):
+        """Выдача сообщает, что старые совпадения не ранжировались."""
+        Post.objects.create(author=self.user, text='Кот')
+        backend = get_backend()
+        self.assertFalse(backend.search('собака').truncated)
+        first = backend.search('кот', limit=1)
+        self.assertTrue(first.truncated)
+        second = backend.search('кот', cursor=first.next_cursor, limit=1)
+        self.assertTrue(second.truncated)
+        self.assertFalse(second.has_next())
+        response = self.client.get(reverse('posts:search'), {'q': 'кот'})
+        self.assertContains(response, 'Совпадений слишком много')
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(list(get_backend().search('собака')), [
+            Post.objects.get(text='Собака лает')
+        ])
+
+    def test_empty_query(self):
+        response = self.client.get(reverse('posts:search'), {'q': '!!!'})
+        self.assertEqual(list(response.context['results']), [])
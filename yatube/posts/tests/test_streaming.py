@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+from posts.utils import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class StreamingFeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for i in range(POSTS_PER_PAGE + 1):
+            Post.objects.create(
+                author=self.author, group=self.group, text=f'Пост {i}'
+            )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def chunks(self, url):
+        with override_settings(STREAMING_FEEDS=True):
+            response = self.client.get(url)
+            self.assertTrue(response.streaming)
+            return [chunk.decode() for chunk in response.streaming_content]
+
+    def test_feeds_stream_same_page(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                streamed = ''.join(self.chunks(url))
+                cache.clear()
+                whole = self.client.get(url).content.decode()
+                self.assertEqual(streamed, whole)
+                self.assertNotIn('<!--stream:', streamed)
+
+    def test_head_and_header_sent_before_posts(self):
+        with override_settings(STREAMING_FEEDS=True):
+            chunks = iter(self.client.get(reverse('posts:index')))
+            with CaptureQueriesContext(connection) as queries:
+                first = next(chunks).decode()
+            rest = b''.join(chunks).decode()
+        self.assertIn('bootstrap.min.css', first)
+        self.assertIn('Пользователь:  reader', first)
+        self.assertNotIn('Пост', first)
+        self.assertFalse(any(
+            'posts_post' in query['sql'] for query in queries
+        ))
+        self.assertIn(f'Пост {POSTS_PER_PAGE}', rest)
+
+    def test_cards_are_separate_chunks(self):
+        chunks = self.chunks(reverse('posts:index'))
+        cards = [chunk for chunk in chunks if '<article>' in chunk]
+        self.assertEqual(len(cards), POSTS_PER_PAGE)
+        # Карточки из кэша идут вместе с остальной лентой.
+        chunks = self.chunks(reverse('posts:index'))
+        self.assertLess(len(chunks), POSTS_PER_PAGE)
@@ -0,0 +1,154 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import timeline
+from posts.models import AuthorStats, Follow, Post, TimelineEntry
+from posts.paginator import CursorPaginator
+
+User = get_user_model()
+
+
+def feed(user, per_page=100):
+    """Первая страница ленты подписок user."""
+    paginator = CursorPaginator(
+        Post.objects.all(), per_page,
+        sources=timeline.timeline_sources(user),
+    )
+    return list(paginator.get_page(1))
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        """Подписка заполняет ленту, новые посты раскладываются."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(
+            set(feed(self.reader)),
+            {self.old_post, new_post},
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+
+    def test_unfollow_clears_timeline(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.delete()
+        self.assertFalse(feed(self.reader))
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_fanout_on_read_for_popular_authors(self):
+        """Посты популярных авторов читаются без записи в ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(
+            set(feed(self.reader)),
+            {self.old_post, new_post},
+        )
+
+    @override_settings(
+        TIMELINE_FANOUT_LIMIT=2, TIMELINE_FANOUT_RESUME=1, TIMELINE_SYNC=True
+    )
+    def test_author_back_under_limit_keeps_posts(self):
+        """Посты, написанные выше порога, остаются в лентах после отписок.
+
+        Раскладка возвращается только под нижним порогом.
+        """
+        others = [
+            User.objects.create_user(username=f'other{i}') for i in range(2)
+        ]
+        for user in [self.reader, *others]:
+            Follow.objects.create(user=user, author=self.author)
+        self.assertTrue(
+            AuthorStats.objects.get(user=self.author).fanout_on_read
+        )
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        Follow.objects.get(user=others[1]).delete()
+        self.assertTrue(
+            AuthorStats.objects.get(user=self.author).fanout_on_read
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=new_post).exists()
+        )
+        Follow.objects.get(user=others[0]).delete()
+        self.assertFalse(
+            AuthorStats.objects.get(user=self.author).fanout_on_read
+        )
+        self.assertEqual(
+            set(feed(self.reader)),
+            {self.old_post, new_post},
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1, TIMELINE_FANOUT_RESUME=1)
+    def test_resume_waits_for_commit(self):
+        """Раскладка после отписки не выполняется в запросе отписки."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        with mock.patch('posts.timeline.get_executor') as executor:
+            Follow.objects.get(user=other).delete()
+        executor.assert_not_called()
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=new_post).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_fanout_on_read_without_stats_row(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.filter(user=self.author).delete()
+        self.assertEqual(
+            list(timeline.fanout_on_read_authors(self.reader)),
+            [self.author.pk],
+        )
+
+    def test_rebuild_command(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timeline', stdout=StringIO())
+        self.assertEqual(
+            feed(self.reader), [self.old_post]
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_pages_merge_entries_and_read_authors(self):
+        """Разложенные посты и посты без раскладки идут одной лентой."""
+        popular = User.objects.create_user(username='popular')
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=popular)
+        Post.objects.create(author=popular, text='До порога')
+        Follow.objects.create(user=other, author=popular)
+        for i in range(3):
+            Post.objects.create(author=self.author, text=f'Автор {i}')
+            Post.objects.create(author=popular, text=f'Популярный {i}')
+        expected = list(Post.objects.filter(
+            author__in=[self.author, popular]
+        ).order_by('-pub_date', '-id'))
+        paginator = CursorPaginator(
+            Post.objects.all(), 3,
+            sources=timeline.timeline_sources(self.reader),
+        )
+        page = paginator.get_page(1)
+        posts = list(page)
+        while page.has_next():
+            page = paginator.cursor_page(page.next_cursor)
+            posts.extend(page)
+        self.assertEqual(posts, expected)
+        self.assertEqual(
+            list(paginator.get_page(2)), expected[3:6]
+        )
@@ -28,7 +28,7 @@ class TaskPagesTests(TestCase):
         )
 
     def setUp(self):
-
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -150,6 +150,7 @@ class TaskPagesTests(TestCase):
         self.assertNotIn(newpost, response.context['page_obj'])
 
     def test_cache_index(self):
+        """Карточка поста кэшируется до изменения самого поста."""
         post = Post.objects.create(
             text='Новый тестовый текст поста',
             author=self.user_author,
@@ -157,13 +158,33 @@ class TaskPagesTests(TestCase):
         )
         response = self.authorized_author.get(reverse('posts:index'))
         cache_1 = response.content
-        post.delete()
+        Post.objects.filter(pk=post.pk).update(text='Текст мимо кэша')
         response = self.authorized_author.get(reverse('posts:index'))
         self.assertEqual(response.content, cache_1)
         cache.clear()
         response = self.authorized_author.get(reverse('posts:index'))
         self.assertNotEqual(response.content, cache_1)
 
+    def test_cache_card_invalidated_on_edit(self):
+        post = Post.objects.create(
+            text='Новый тестовый текст поста',
+            author=self.user_author,
+        )
+        self.authorized_author.get(reverse('posts:index'))
+        post.text = 'Отредактированный текст'
+        post.save()
+        response = self.authorized_author.get(reverse('posts:index'))
+        self.assertContains(response, 'Отредактированный текст')
+
+    def test_cache_card_invalidated_on_group_change(self):
+        self.authorized_author.get(reverse('posts:index'))
+        self.group.slug = 'renamed-slug'
+        self.group.save()
+        response = self.authorized_author.get(reverse('posts:index'))
+        self.assertContains(response, '/group/renamed-slug/')
+        self.group.slug = 'slug-test'
+        self.group.save()
+
     def test_authorized_user_follow(self):
         response = self.authorized_client.get(reverse('posts:follow_index'))
         context = len(response.context['page_obj'])
@@ -180,6 +201,19 @@ class TaskPagesTests(TestCase):
         response = self.authorized_client.get(reverse('posts:follow_index'))
         self.assertEqual(len(response.context['page_obj']), context)
 
+    def test_follow_is_idempotent(self):
+        url = reverse(
+            'posts:profile_follow', kwargs={'username': self.user_author}
+        )
+        self.authorized_client.get(url)
+        self.authorized_client.get(url)
+        self.assertEqual(
+            Follow.objects.filter(
+                user=self.user, author=self.user_author
+            ).count(),
+            1,
+        )
+
     def test_unfollow_client(self):
         response = self.authorized_client.get(reverse('posts:follow_index'))
         context_auth = len(response.context['page_obj'])
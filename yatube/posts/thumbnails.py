@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+from sorl.thumbnail import get_thumbnail
+
+from . import versions
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.POST_THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def variant_formats():
+    """Форматы вариантов, которые умеет кодировать установленный Pillow."""
+    Image.init()
+    return [
+        (name, mime) for name, mime in settings.POST_IMAGE_FORMATS
+        if name.upper() in Image.SAVE
+    ]
+
+
+def build_variants(image):
+    """Кадрирует картинку под ленту и сохраняет её в нескольких ширинах.
+
+    Возвращает список {'type': mime, 'srcset': ..., 'files': [...]} от
+    самого современного формата к наименее; files — имена файлов в
+    хранилище, чтобы удалить их вместе с картинкой.
+    """
+    width, height = (
+        int(size) for size in settings.POST_THUMBNAIL_GEOMETRY.split('x')
+    )
+    stem = os.path.splitext(os.path.basename(image.name))[0]
+    storage = image.storage
+    with image.open('rb'), Image.open(image) as original:
+        original = original.convert('RGB')
+        sources = []
+        for fmt, mime in variant_formats():
+            srcset, files = [], []
+            for target in settings.POST_IMAGE_WIDTHS:
+                size = (target, round(target * height / width))
+                variant = ImageOps.fit(original, size, Image.LANCZOS)
+                buffer = BytesIO()
+                variant.save(buffer, fmt.upper(),
+                             quality=settings.POST_IMAGE_QUALITY)
+                name = storage.save(
+                    f'posts/variants/{stem}-{target}w.{fmt}',
+                    ContentFile(buffer.getvalue()),
+                )
+                srcset.append(f'{storage.url(name)} {target}w')
+                files.append(name)
+            sources.append({
+                'type': mime, 'srcset': ', '.join(srcset), 'files': files,
+            })
+    return sources
+
+
+def variant_files(variants):
+    """Имена файлов из JSON поля Post.variants."""
+    try:
+        sources = json.loads(variants) if variants else []
+    except ValueError:
+        return []
+    return [name for source in sources for name in source.get('files', ())]
+
+
+def discard_variants(variants):
+    """Удаляет файлы вариантов после коммита: откат вернул бы ссылки."""
+    names = variant_files(variants)
+    if not names:
+        return
+    storage = Post._meta.get_field('image').storage
+
+    def delete():
+        for name in names:
+            storage.delete(name)
+    transaction.on_commit(delete)
+
+
+def generate(post_id, source):
+    """Строит миниатюру и варианты, если картинка поста не сменилась."""
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id, image=source
+    ).first()
+    if post is None:
+        return None
+    thumbnail = get_thumbnail(
+        post.image, settings.POST_THUMBNAIL_GEOMETRY,
+        **settings.POST_THUMBNAIL_OPTIONS,
+    )
+    updated = Post.objects.filter(pk=post_id, image=source).update(
+        thumbnail=thumbnail.name,
+        variants=json.dumps(build_variants(post.image)),
+        updated=timezone.now(),
+    )
+    if updated:
+        discard_variants(post.variants)
+        versions.touch(*versions.post_keys(post))
+    return thumbnail.name
+
+
+def _run(post_id, source):
+    close_old_connections()
+    try:
+        generate(post_id, source)
+    except Exception:
+        logger.exception('Не удалось построить миниатюру поста %s', post_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(post):
+    """Ставит построение миниатюры в фоновый пул после коммита."""
+    post_id, source = post.pk, post.image.name
+    if settings.POST_THUMBNAIL_SYNC:
+        generate(post_id, source)
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_run, post_id, source)
+    )
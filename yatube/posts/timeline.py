@@ -0,0 +1,178 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='timeline',
+        )
+    return _executor
+
+
+def is_fanout_author(author):
+    """Раскладываются ли посты автора по лентам подписчиков.
+
+    Без строки AuthorStats подписчики считаются по подпискам.
+    """
+    row = AuthorStats.objects.filter(user=author).values_list(
+        'followers_count', 'fanout_on_read'
+    ).first()
+    if row is None:
+        row = Follow.objects.filter(author=author).count(), False
+    followers, on_read = row
+    return not on_read and followers <= settings.TIMELINE_FANOUT_LIMIT
+
+
+def _bulk_add(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if not is_fanout_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def _recent_posts(author):
+    posts = Post.objects.filter(author=author).values_list('id', 'pub_date')
+    limit = settings.TIMELINE_BACKFILL_LIMIT
+    if limit is not None:
+        posts = posts[:limit]
+    return posts
+
+
+def backfill(user, author):
+    """Добавляет в ленту последние посты автора после подписки."""
+    if not is_fanout_author(author):
+        return
+    _bulk_add(
+        TimelineEntry(user=user, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in _recent_posts(author)
+    )
+
+
+def follower_gained(author):
+    """Отключает раскладку, когда подписчиков стало больше порога."""
+    AuthorStats.objects.filter(
+        user=author,
+        fanout_on_read=False,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).update(fanout_on_read=True)
+
+
+def follower_lost(author):
+    """Возвращает раскладку под нижним порогом TIMELINE_FANOUT_RESUME.
+
+    Нижний порог не даёт автору у границы переключаться туда и обратно
+    на каждой подписке. Посты, написанные без раскладки, раскладываются
+    по лентам подписчиков после коммита в фоновом пуле: в запросе
+    отписавшегося это подписчики × посты вставок.
+    """
+    resumed = AuthorStats.objects.filter(
+        user=author,
+        fanout_on_read=True,
+        followers_count__lte=settings.TIMELINE_FANOUT_RESUME,
+    ).update(fanout_on_read=False)
+    if not resumed:
+        return
+    if settings.TIMELINE_SYNC:
+        resume(author)
+        return
+    transaction.on_commit(lambda: get_executor().submit(_run, author))
+
+
+def _run(author):
+    close_old_connections()
+    try:
+        resume(author)
+    except Exception:
+        logger.exception('Не удалось разложить посты автора %s', author)
+    finally:
+        close_old_connections()
+
+
+def resume(author):
+    """Раскладывает последние посты автора по лентам подписчиков."""
+    posts = list(_recent_posts(author))
+    followers = Follow.objects.filter(
+        author=author
+    ).values_list('user_id', flat=True)
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id in followers.iterator()
+        for post_id, pub_date in posts
+    )
+
+
+def remove_author(user, author):
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def rebuild(user):
+    TimelineEntry.objects.filter(user=user).delete()
+    for follow in Follow.objects.filter(user=user).select_related('author'):
+        backfill(user, follow.author)
+
+
+def fanout_on_read_authors(user):
+    """Авторы, посты которых не раскладываются и читаются напрямую.
+
+    То же условие, что в is_fanout_author, одним запросом.
+    """
+    followers = Follow.objects.filter(
+        author=OuterRef('author')
+    ).order_by().values('author').annotate(total=Count('id')).values('total')
+    return list(Follow.objects.filter(user=user).annotate(
+        followers=Coalesce(
+            'author__stats__followers_count',
+            Subquery(followers, output_field=IntegerField()),
+        ),
+    ).filter(
+        Q(author__stats__fanout_on_read=True)
+        | Q(followers__gt=settings.TIMELINE_FANOUT_LIMIT)
+    ).values_list('author_id', flat=True))
+
+
+def timeline_sources(user):
+    """Выборки ленты подписок для CursorPaginator(sources=...).
+
+    Разложенные посты читаются по индексу записей ленты, посты авторов
+    без раскладки — отдельным запросом по индексу постов автора.
+    """
+    def sources(posts):
+        entries = posts.filter(timeline_entries__user=user).annotate(
+            entry_date=F('timeline_entries__pub_date'),
+            entry_post=F('timeline_entries__post'),
+        )
+        result = [(entries, ('entry_date', 'entry_post'))]
+        authors = fanout_on_read_authors(user)
+        if authors:
+            result.append(
+                (posts.filter(author_id__in=authors), ('pub_date', 'id'))
+            )
+        return result
+    return sources
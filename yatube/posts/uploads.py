@@ -0,0 +1,99 @@
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.forms import ImageField
+from PIL import Image, ImageOps
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку кусками во временный файл и не дальше лимита.
+
+    Байты сверх POST_IMAGE_MAX_BYTES отбрасываются, а файл помечается
+    too_large, поэтому ни память, ни диск не растут с размером запроса.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_BYTES:
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.too_large = self.received > settings.POST_IMAGE_MAX_BYTES
+        return upload
+
+
+def _reencode(upload, image):
+    """Пересохраняет картинку без метаданных во временный файл."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    clean = UploadedFile(
+        tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR),
+        upload.name, upload.content_type, 0, upload.charset,
+    )
+    fmt = upload.image.format
+    options = {'quality': settings.POST_IMAGE_QUALITY}
+    if fmt == 'JPEG':
+        image = image.convert('RGB')
+        options['optimize'] = True
+    image.save(clean, fmt, **options)
+    clean.size = clean.tell()
+    clean.seek(0)
+    clean.image = upload.image
+    return clean
+
+
+class BoundedImageField(ImageField):
+    default_error_messages = {
+        'too_large': 'Файл больше %(limit)s МБ.',
+        'too_many_pixels': 'Картинка больше %(limit)s мегапикселей.',
+        'format': 'Формат %(format)s не поддерживается.',
+    }
+
+    def to_python(self, data):
+        if not data:
+            return super().to_python(data)
+        limit = settings.POST_IMAGE_MAX_BYTES
+        if getattr(data, 'too_large', False) or data.size > limit:
+            raise ValidationError(
+                self.error_messages['too_large'], code='too_large',
+                params={'limit': limit // (1024 * 1024)},
+            )
+        self._check_header(data)
+        upload = super().to_python(data)
+        if upload.image.format not in settings.POST_IMAGE_REENCODE:
+            return upload
+        upload.seek(0)
+        with Image.open(upload) as image:
+            return _reencode(upload, image)
+
+    def _check_header(self, data):
+        # Image.open читает только заголовок: размеры известны без
+        # декодирования пикселей.
+        try:
+            with Image.open(data) as image:
+                fmt, (width, height) = image.format, image.size
+        except Exception:
+            return
+        finally:
+            data.seek(0)
+        if fmt not in settings.POST_IMAGE_ALLOWED_FORMATS:
+            raise ValidationError(
+                self.error_messages['format'], code='format',
+                params={'format': fmt},
+            )
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                self.error_messages['too_many_pixels'],
+                code='too_many_pixels',
+                params={'limit': settings.POST_IMAGE_MAX_PIXELS // 10 ** 6},
+            )
@@ -0,0 +1,39 @@
+from django.utils.functional import SimpleLazyObject
+
+from core import streaming
+
+from .models import Comment
+from .paginator import CursorPaginator
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+# Связи, которые читает карточка поста в лентах; группы подставляются
+# из posts.groups.
+FEED_RELATED = ('author',)
+# Параметры запроса, которые читает пагинация лент.
+FEED_PARAMS = (CursorPaginator.page_param, CursorPaginator.cursor_param)
+
+
+def get_page_obj(request, posts, per_page=POSTS_PER_PAGE, sources=None):
+    """Страница ленты; при потоковом рендере выбирается при первом чтении.
+
+    Так выборка постов происходит уже после отправки каркаса страницы.
+    sources — см. CursorPaginator.
+    """
+    paginator = CursorPaginator(posts, per_page, sources=sources)
+    if streaming.enabled(request):
+        return SimpleLazyObject(lambda: paginator.from_request(request))
+    return paginator.from_request(request)
+
+
+def get_comment_page(post_id, cursor=None, per_page=COMMENTS_PER_PAGE):
+    """Комментарии поста от старых к новым, по курсору."""
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related(
+            'author'
+        ).order_by('pub_date', 'id'),
+        per_page, descending=False,
+    )
+    if cursor:
+        return paginator.cursor_page(cursor)
+    return paginator.get_page(1)
@@ -0,0 +1,119 @@
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from django.views.decorators.http import condition
+
+from core.holes import cache_shell
+
+from .models import Post, ResourceVersion
+
+# Переименование группы меняет карточки на всех лентах сразу.
+GROUPS_KEY = 'groups'
+
+
+def touch(*keys):
+    """Сдвигает версии ресурсов на текущее время."""
+    keys = list(dict.fromkeys(filter(None, keys)))
+    if not keys:
+        return
+    now = timezone.now()
+    ResourceVersion.objects.bulk_create(
+        [ResourceVersion(key=key, updated=now) for key in keys],
+        ignore_conflicts=True,
+    )
+    ResourceVersion.objects.filter(key__in=keys).update(updated=now)
+
+
+def post_keys(post, group_slug=None):
+    """Ресурсы, на которых виден пост: лента, группа, автор и сам пост."""
+    keys = ['index', f'author:{post.author.username}', f'post:{post.pk}']
+    if post.group_id:
+        keys.append(f'group:{post.group.slug}')
+    if group_slug:
+        keys.append(f'group:{group_slug}')
+    return keys
+
+
+def latest(keys):
+    return ResourceVersion.objects.filter(
+        key__in=keys
+    ).aggregate(updated=Max('updated'))['updated']
+
+
+def _version(request, keys_func, args, kwargs, with_request=False):
+    # etag_func и last_modified_func вызываются по очереди: версию
+    # читаем один раз на запрос.
+    if not hasattr(request, '_resource_version'):
+        if with_request:
+            args = (request, *args)
+        keys = keys_func(*args, **kwargs)
+        request._resource_version = latest(keys) if keys else None
+    return request._resource_version
+
+
+def viewer(request):
+    """Часть ETag, которая зависит от того, кто смотрит.
+
+    Формы на страницах пользователя несут CSRF-токен, а вход меняет его:
+    без токена в ETag 304 после повторного входа оставил бы в браузере
+    форму со старым токеном, и отправка падала бы с 403. В ETag попадает
+    подпись токена, а не он сам.
+    """
+    if not request.user.is_authenticated:
+        return '0'
+    token = request.META.get('CSRF_COOKIE', '')
+    digest = salted_hmac('posts.versions.viewer', token).hexdigest()[:12]
+    return f'{request.user.pk}.{digest}'
+
+
+def conditional(keys_func, with_request=False):
+    """condition() с валидаторами из ResourceVersion.
+
+    keys_func получает аргументы представления (с with_request — и сам
+    запрос) и возвращает ключи ресурсов страницы. Версия читается одним
+    запросом до того, как представление построит выборки, поэтому 304
+    почти ничего не стоит. В ETag входит viewer(request): страница
+    зависит от того, кто смотрит.
+    """
+    def last_modified(request, *args, **kwargs):
+        return _version(request, keys_func, args, kwargs, with_request)
+
+    def etag(request, *args, **kwargs):
+        updated = last_modified(request, *args, **kwargs)
+        if updated is None:
+            return None
+        return f'{viewer(request)}-{updated.timestamp():.6f}'
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def shell_cached(keys_func, params=()):
+    """Кэш общей части страницы по той же версии, что и у condition().
+
+    params — параметры запроса, от которых зависит страница.
+    """
+    def version(request, *args, **kwargs):
+        return _version(request, keys_func, args, kwargs)
+
+    return cache_shell(version, params=params)
+
+
+def index_keys():
+    return ['index']
+
+
+def group_keys(slug):
+    return [f'group:{slug}']
+
+
+def profile_keys(username):
+    return [f'author:{username}', GROUPS_KEY]
+
+
+def post_detail_keys(post_id):
+    username = Post.objects.filter(
+        pk=post_id
+    ).values_list('author__username', flat=True).first()
+    if username is None:
+        return []
+    return [f'post:{post_id}', f'author:{username}', GROUPS_KEY]
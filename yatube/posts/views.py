@@ -1,78 +1,124 @@
-from django.core.paginator import Paginator
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
-# from django.views.decorators.cache import cache_page
+from django.db import IntegrityError, transaction
+from django.http import Http404, JsonResponse
+from django.urls import reverse
 
-from .models import Post, Group, Follow
+from core import streaming
+from core.db import replica_reads, retry_on_locked
+
+from . import groups
+from .api import comment_data
+from .models import Post, Follow
+from .counters import get_stats
 from .forms import PostForm, CommentForm
+from .search import get_backend as get_search_backend
+from .timeline import timeline_sources
+from .utils import (
+    FEED_PARAMS, FEED_RELATED, POSTS_PER_PAGE, get_comment_page,
+    get_page_obj,
+)
+from .versions import (
+    conditional, group_keys, index_keys, post_detail_keys, profile_keys,
+    shell_cached,
+)
 
 User = get_user_model()
 
 
-# @cache_page(60 * 15)
+@replica_reads
+@conditional(index_keys)
+@shell_cached(index_keys, params=FEED_PARAMS)
 def index(request):
-    posts = Post.objects.select_related('group')
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.select_related(*FEED_RELATED)
+    page_obj = get_page_obj(request, posts)
     context = {
         'page_obj': page_obj,
     }
-    return render(request, 'posts/index.html', context)
+    return streaming.render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@conditional(group_keys)
+@shell_cached(group_keys, params=FEED_PARAMS)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.filter(group=group)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    group = groups.get_by_slug(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    posts = Post.objects.filter(group=group).select_related(*FEED_RELATED)
+    page_obj = get_page_obj(request, posts)
     context = {
         'group': group,
         'page_obj': page_obj,
     }
-    return render(request, 'posts/group_list.html', context,)
+    return streaming.render(request, 'posts/group_list.html', context,)
 
 
+@replica_reads
+@conditional(profile_keys)
+@shell_cached(profile_keys, params=FEED_PARAMS)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post = Post.objects.filter(author=author)
-    paginator = Paginator(post, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(user=request.user,
-                                          author=author).exists()
-    else:
-        following = False
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    get_stats(author)
+    post = Post.objects.filter(author=author).select_related(*FEED_RELATED)
+    page_obj = get_page_obj(request, post)
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following,
     }
-    return render(request, 'posts/profile.html', context)
+    return streaming.render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@conditional(post_detail_keys)
+@shell_cached(post_detail_keys)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
-    form = CommentForm()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats'), pk=post_id
+    )
+    groups.attach([post])
+    get_stats(post.author)
     context = {
         'post': post,
-        'comments': comments,
-        'form': form,
+        'comments': get_comment_page(post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@retry_on_locked
+@transaction.atomic
+def _insert_post(post):
+    post.pk = None
+    post.save(force_insert=True)
+
+
+def create_post(post):
+    """Сохраняет новый пост; при блокировке повторяется только запись в БД.
+
+    Картинка кладётся в хранилище один раз до транзакции: иначе каждая
+    откатившаяся попытка оставляла бы свою копию файла без поста. Если
+    пост так и не записался, файл удаляется.
+    """
+    if post.image:
+        post.image.save(post.image.name, post.image.file, save=False)
+    try:
+        _insert_post(post)
+    except Exception:
+        if post.image:
+            post.image.delete(save=False)
+        raise
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        create_post(post)
         return redirect('posts:profile', request.user)
     context = {
         'form': form,
@@ -80,6 +126,30 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@replica_reads
+@conditional(post_detail_keys)
+def post_comments(request, post_id):
+    """Следующая порция комментариев: HTML-фрагмент или JSON."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404('Пост не найден')
+    page = get_comment_page(post_id, request.GET.get('cursor'))
+    if request.GET.get('format') != 'json':
+        return render(request, 'posts/includes/comment_list.html', {
+            'comments': page,
+            'post_id': post_id,
+        })
+    next_url = None
+    if page.has_next():
+        next_url = '{}?format=json&cursor={}'.format(
+            reverse('posts:post_comments', args=[post_id]), page.next_cursor
+        )
+    return JsonResponse({
+        'comments': [comment_data(comment) for comment in page],
+        'next_cursor': page.next_cursor,
+        'next': next_url,
+    })
+
+
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -91,7 +161,12 @@ def post_edit(request, post_id):
         files=request.FILES or None,
         instance=post)
     if form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        post.save(
+            update_fields=[
+                *form.Meta.fields, 'updated', 'thumbnail', 'variants',
+            ]
+        )
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -102,6 +177,8 @@ def post_edit(request, post_id):
 
 
 @login_required
+@retry_on_locked
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -114,12 +191,14 @@ def add_comment(request, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
+    page = get_page_obj(
+        request,
+        Post.objects.select_related(*FEED_RELATED),
+        sources=timeline_sources(request.user),
+    )
+    return streaming.render(
         request,
         'posts/follow.html',
         {'page_obj': page}
@@ -127,6 +206,7 @@ def follow_index(request):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author == request.user:
@@ -134,16 +214,11 @@ def profile_follow(request, username):
             'posts:profile',
             username=username
         )
-    follower = Follow.objects.filter(
-        user=request.user,
-        author=author
-    ).exists()
-    if follower is True:
-        return redirect(
-            'posts:profile',
-            username=username
-        )
-    Follow.objects.create(user=request.user, author=author)
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=request.user, author=author)
+    except IntegrityError:
+        pass
     return redirect(
         'posts:profile',
         username=username
@@ -151,6 +226,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     if author == request.user:
@@ -164,3 +240,17 @@ def profile_unfollow(request, username):
         'posts:profile',
         username=username
     )
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results = None
+    if query:
+        results = get_search_backend().search(
+            query, cursor=request.GET.get('cursor'), limit=POSTS_PER_PAGE
+        )
+    context = {
+        'query': query,
+        'results': results,
+    }
+    return render(request, 'posts/search.html', context)
@@ -0,0 +1,14 @@
+"""
+ASGI config for yatube project.
+
+Django 2.2 не умеет ASGI сам: приложение из wsgi.py (с прогревом кэшей)
+оборачивается в core.asgi.ASGIHandler. Запуск, например:
+
+    uvicorn yatube.asgi:application --workers 4
+"""
+
+from core.asgi import ASGIHandler
+
+from .wsgi import application as wsgi_application
+
+application = ASGIHandler(wsgi_application)
@@ -25,6 +25,15 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки пишутся кусками во временный файл, а не в память; сверх
+# POST_IMAGE_MAX_BYTES байты отбрасываются ещё при приёме.
+FILE_UPLOAD_HANDLERS = ['posts.uploads.BoundedUploadHandler']
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 10 ** 6
+POST_IMAGE_ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+# Форматы, которые пересохраняются без EXIF и прочих метаданных.
+POST_IMAGE_REENCODE = ('JPEG', 'PNG', 'WEBP')
+
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -52,11 +61,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -65,7 +76,8 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Стандартный движок с замером времени рендера для core.metrics.
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         # Добавлено: Искать шаблоны на уровне проекта
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
 
@@ -84,8 +96,34 @@ TEMPLATES = [
     }
 ]
 
+# Боевой режим шаблонов (TEMPLATE_CACHE=1): разобранные шаблоны хранятся
+# в памяти процесса, а не читаются и не разбираются на каждый рендер, и
+# без отладочной разметки. Все шаблоны проекта загружаются при старте
+# воркера (yatube/wsgi.py). После правки шаблонов воркеры перезапускают.
+TEMPLATE_CACHE = os.environ.get('TEMPLATE_CACHE', '') == '1'
+TEMPLATE_WARMUP = TEMPLATE_CACHE
+if TEMPLATE_CACHE:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['debug'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+# Потоковый рендер лент (STREAMING_FEEDS=1, core.streaming): <head> и шапка
+# уходят клиенту до выборки постов, затем карточки по одной. Такие
+# страницы не берутся из кэша каркасов и отдаются без Content-Length.
+STREAMING_FEEDS = os.environ.get('STREAMING_FEEDS', '') == '1'
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# ASGI-режим (yatube/asgi.py): потоки, в которых выполняется Django, и
+# сколько байт тела запроса держать в памяти до сброса во временный файл.
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 8))
+ASGI_BODY_SPOOL_BYTES = 1024 * 1024
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -94,9 +132,61 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами; перед запросом проверяется
+        # core.db.close_unusable_connections.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+# Реплики для чтения: DB_REPLICAS=/srv/replica1.sqlite3,/srv/replica2.sqlite3
+# (для PostgreSQL алиасы описываются в DATABASES так же). В тестах
+# реплики смотрят в тестовую базу default.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# Режим SQLite для конкурентной нагрузки (SQLITE_TUNING=1): WAL, чтобы
+# чтения не блокировали запись, и ожидание занятой базы вместо ошибки.
+# Прагмы применяются к каждому новому соединению.
+SQLITE_PRAGMAS = {}
+if os.environ.get('SQLITE_TUNING', '') == '1':
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+    }
+# Повторы пишущих представлений при «database is locked».
+SQLITE_RETRY_ATTEMPTS = 5
+SQLITE_RETRY_DELAY = 0.05
+
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+DATABASE_HEALTH_CHECKS = True
+# Сколько секунд после записи чтения пользователя идут в default.
+DATABASE_PIN_SECONDS = 5
+DATABASE_PIN_COOKIE = 'db_pin'
+
+# Метрики производительности на /metrics/ (core.metrics): METRICS_ENABLED=1
+# включает, METRICS_SAMPLE_RATE — доля замеряемых запросов, METRICS_TOKEN
+# закрывает страницу Bearer-токеном.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '') == '1'
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 1.0))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+METRICS_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -135,8 +225,83 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Общий кэш задаётся переменной окружения CACHE_URL:
+#   redis://host:6379/0  — Redis через django-redis из requirements.txt;
+#   file:///var/tmp/yatube — файловый кэш, общий для воркеров одной машины;
+#   db                     — таблица в БД (manage.py createcachetable).
+# Без переменной используется локальный LocMemCache.
+CACHE_URL = os.environ.get('CACHE_URL', '')
+
+if CACHE_URL.startswith(('redis://', 'rediss://', 'unix://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
     }
-}
+elif CACHE_URL.startswith('file://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_URL[len('file://'):],
+        }
+    }
+elif CACHE_URL == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'yatube_cache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Защита от лавины промахов в core.cache.get_or_set.
+CACHE_EARLY_EXPIRATION_BETA = 1.0
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_WAIT = 2.0
+CACHE_LOCK_POLL_INTERVAL = 0.05
+
+# Лента подписок: посты авторов с числом подписчиков больше
+# TIMELINE_FANOUT_LIMIT не раскладываются по лентам при записи,
+# а подмешиваются при чтении. Раскладка возвращается, когда подписчиков
+# становится не больше TIMELINE_FANOUT_RESUME; посты автора
+# раскладываются по лентам в фоновом пуле, с TIMELINE_SYNC — сразу.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_FANOUT_RESUME = 900
+TIMELINE_SYNC = False
+TIMELINE_BACKFILL_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Справочник групп: общий кэш плюс копия в памяти процесса, которая
+# сверяется с общим кэшем не чаще раза в GROUP_CACHE_LOCAL_TTL секунд.
+GROUP_CACHE_TIMEOUT = 60 * 60 * 24
+GROUP_CACHE_LOCAL_TTL = 5
+GROUP_CACHE_WARMUP = os.environ.get('GROUP_CACHE_WARMUP', '') == '1'
+
+# Общая для всех пользователей часть страниц лент и поста (core.holes).
+PAGE_SHELL_CACHE_TIMEOUT = 60 * 60
+
+# Миниатюры постов строятся в фоновом пуле потоков после загрузки.
+POST_THUMBNAIL_GEOMETRY = '960x339'
+POST_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+POST_THUMBNAIL_WORKERS = 2
+POST_THUMBNAIL_SYNC = False
+# Адаптивные варианты для srcset; AVIF пропускается, если Pillow его
+# не поддерживает.
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+POST_IMAGE_FORMATS = (
+    ('avif', 'image/avif'),
+    ('webp', 'image/webp'),
+)
+POST_IMAGE_QUALITY = 80
+
+# Полнотекстовый поиск: SQLite FTS5 или SimpleSearchBackend для других СУБД.
+POST_SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+POST_SEARCH_SNIPPET_TOKENS = 16
+POST_SEARCH_MAX_CANDIDATES = 1000
@@ -3,10 +3,14 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics
+
 urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('admin/', admin.site.urls),
+    path('metrics/', metrics, name='metrics'),
+    path('api/v1/', include('posts.api_urls')),
     path('about/', include('about.urls', namespace='about')),
     path('', include('posts.urls', namespace='posts'))
 ]
@@ -14,3 +14,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.GROUP_CACHE_WARMUP:
+    from posts.groups import warm_up
+
+    warm_up()
+
+if settings.TEMPLATE_WARMUP:
+    from core.template_backends import warm_up as warm_up_templates
+
+    warm_up_templates()